@@ -1,7 +1,7 @@
 from flask import Flask, request, jsonify
 import time
 from recommendation import recommendation_engine
-from config import DEFAULT_RECOMMENDATIONS , Minimum_CTR
+from config import DEFAULT_RECOMMENDATIONS , Minimum_CTR, MAX_BATCH_CARTS
 from ctr_monitor import get_ctr_last_7_days
 
             
@@ -10,22 +10,16 @@ app = Flask(__name__)
 
 
 
-@app.route('/api/recommend/cart', methods=['POST'])
-def recommend():
-    start_time = time.time()
-    data = request.get_json()
-
-    item_ids_param = data.get('item_ids') if data else None
-    count_param = data.get('count') if data else None
-
+def parse_item_ids(item_ids_param):
     # Default to empty list if item_ids missing or invalid
     if not item_ids_param:
-        item_ids = []
+        return []
     elif isinstance(item_ids_param, list):
-        item_ids = [str(item).strip() for item in item_ids_param]
+        return [str(item).strip() for item in item_ids_param]
     else:
-        item_ids = [item.strip() for item in str(item_ids_param).split(',')]
+        return [item.strip() for item in str(item_ids_param).split(',')]
 
+def parse_count(count_param):
     # Convert count or fall back to default
     try:
         count = int(count_param) if count_param else DEFAULT_RECOMMENDATIONS
@@ -33,6 +27,16 @@ def recommend():
             count = DEFAULT_RECOMMENDATIONS
     except:
         count = DEFAULT_RECOMMENDATIONS
+    return count
+
+
+@app.route('/api/recommend/cart', methods=['POST'])
+def recommend():
+    start_time = time.time()
+    data = request.get_json()
+
+    item_ids = parse_item_ids(data.get('item_ids') if data else None)
+    count = parse_count(data.get('count') if data else None)
 
     # Get recommendations
     recommendations = recommendation_engine.get_recommendations(item_ids, count)
@@ -49,6 +53,75 @@ def recommend():
         "processing_time_ms": round(processing_time, 2),
 
     })
+
+#checkout, abandoned-cart emails and page-render jobs
+@app.route('/api/recommend/cart/batch', methods=['POST'])
+def recommend_batch():
+    start_time = time.time()
+    data = request.get_json(silent=True)
+
+    carts_param = data.get('carts') if isinstance(data, dict) else None
+    if not isinstance(carts_param, list):
+        return jsonify({
+            "status": "error",
+            "message": "body must be an object whose 'carts' is a list of {item_ids, count} objects"
+        }), 400
+    if len(carts_param) > MAX_BATCH_CARTS:
+        return jsonify({
+            "status": "error",
+            "message": f"at most {MAX_BATCH_CARTS} carts per batch, got {len(carts_param)}"
+        }), 400
+
+    carts = []
+    for i, cart in enumerate(carts_param):
+        if not isinstance(cart, dict):
+            return jsonify({
+                "status": "error",
+                "message": f"carts[{i}] must be an {{item_ids, count}} object"
+            }), 400
+        carts.append((parse_item_ids(cart.get('item_ids')), parse_count(cart.get('count'))))
+
+    # Get recommendations for every cart in one engine call
+    batch, timings = recommendation_engine.get_batch_recommendations(carts)
+
+    processing_time = (time.time() - start_time) * 1000  # Convert to milliseconds
+
+    return jsonify({
+        "status": "success",
+        "results": [
+            {
+                "input_items": item_ids,
+                "recommendations": recommendations,
+                "count": len(recommendations),
+                "processing_time_ms": round(cart_time, 2)
+            }
+            for (item_ids, _), recommendations, cart_time in zip(carts, batch, timings)
+        ],
+        "carts": len(carts),
+        "processing_time_ms": round(processing_time, 2)
+    })
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        "status": "success",
+        **recommendation_engine.cache_stats()
+    })
+
+def incremental_job_running(job_id):
+    # start_refresh hands back the running job instead of starting another,
+    # so a full refresh request may get an incremental job: tell the caller
+    # no full re-mine started rather than report it as one
+    job = recommendation_engine.get_job(job_id)
+    if job['kind'] == 'full':
+        return None
+    return jsonify({
+        "status": "busy",
+        "message": "An incremental refresh is running, no full refresh was started. Retry once it is done.",
+        "job_id": job_id,
+        "kind": job['kind']
+    }), 409
+
 #weekly by n8n
 @app.route('/api/refresh', methods=['POST'])
 def refresh():
@@ -61,14 +134,17 @@ def refresh():
         print(f"[CTR MONITOR] Weekly CTR = {ctr}")
         if ctr < Minimum_CTR:
             print("[CTR MONITOR] Low CTR detected, refreshing recommendation engine...")
-            start_time = time.time()
-            recommendation_engine.initialize()
-            processing_time = (time.time() - start_time) * 1000  # Convert to milliseconds
+            job_id = recommendation_engine.start_refresh()
+            busy = incremental_job_running(job_id)
+            if busy is not None:
+                return busy
             return jsonify({
-                "status": "retrained",
-                "message": "Le moteur de recommandation a bien été mis à jour.",
-                "processing_time_ms": round(processing_time, 2)
-            })
+                "status": "retraining",
+                "message": "La mise à jour du moteur de recommandation a été lancée.",
+                "job_id": job_id,
+                "kind": "full",
+                "ctr": round(ctr, 5)
+            }), 202
         else:
             return jsonify({
                 "status": "skipped",
@@ -82,20 +158,42 @@ def refresh():
             "ctr": round(ctr, 5)
         })
 
+#daily/hourly by n8n: fold new orders into the rules without a full re-mine
+@app.route('/api/incremental-refresh', methods=['POST'])
+def incremental_refresh():
+    print("[INCREMENTAL REFRESH] Updating rules with new orders...")
+
+    try:
+        job_id = recommendation_engine.start_refresh(incremental=True)
+        return jsonify({
+            "status": "started",
+            "message": "Incremental refresh started in the background.",
+            "job_id": job_id,
+            "kind": recommendation_engine.get_job(job_id)['kind']
+        }), 202
+    except Exception as e:
+        print(f"[ERROR] Failed to refresh incrementally: {e}")
+        return jsonify({
+            "status": "error",
+            "message": f"Incremental refresh failed: {str(e)}"
+        }), 500
+
 #force refresh by admin
 @app.route('/api/force-refresh', methods=['POST'])
 def force_refresh():
     print("[FORCE REFRESH] Forcing recommendation engine refresh...")
-    start_time = time.time()
     
     try:
-        recommendation_engine.initialize()
-        processing_time = (time.time() - start_time) * 1000  # ms
+        job_id = recommendation_engine.start_refresh()
+        busy = incremental_job_running(job_id)
+        if busy is not None:
+            return busy
         return jsonify({
-            "status": "success",
-            "message": "Recommendation engine forcibly refreshed.",
-            "processing_time_ms": round(processing_time, 2)
-        })
+            "status": "started",
+            "message": "Recommendation engine refresh started in the background.",
+            "job_id": job_id,
+            "kind": "full"
+        }), 202
     except Exception as e:
         print(f"[ERROR] Failed to force refresh: {e}")
         return jsonify({
@@ -104,5 +202,16 @@ def force_refresh():
         }), 500
 
 
+@app.route('/api/refresh/status/<job_id>', methods=['GET'])
+def refresh_status(job_id):
+    job = recommendation_engine.get_job(job_id)
+    if job is None:
+        return jsonify({
+            "status": "error",
+            "message": f"Unknown refresh job: {job_id}"
+        }), 404
+    return jsonify(job)
+
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001, debug=True)
\ No newline at end of file
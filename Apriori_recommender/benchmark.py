@@ -0,0 +1,89 @@
+"""
+Benchmarks for the Apriori recommendation service
+
+Usage: python benchmark.py [memory] [batch]
+"""
+import pickle
+import random
+import sys
+import time
+import tracemalloc
+
+import requests
+
+from config import MAX_BATCH_CARTS
+from fetch_data import fetch_transactions, stream_transactions
+from mining import build_basket, build_basket_from_codes
+
+
+def _measure(fn):
+    """Run fn and return its wall time in seconds and peak traced memory in MB"""
+    tracemalloc.start()
+    start_time = time.time()
+    fn()
+    elapsed = time.time() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024)
+
+
+def benchmark_memory():
+    """Peak memory of the DataFrame fetch + groupby basket vs the streamed basket"""
+    def dataframe_path():
+        build_basket(fetch_transactions())
+
+    def streaming_path():
+        build_basket_from_codes(stream_transactions())
+
+    for name, fn in [('dataframe', dataframe_path), ('streaming', streaming_path)]:
+        elapsed, peak = _measure(fn)
+        print(f"{name:<10} {elapsed:8.2f} s  peak {peak:10.1f} MB")
+
+
+def _sample_carts(n_carts, max_items=3, seed=42):
+    """Random carts drawn from the items that trigger at least one rule"""
+    with open("saves/recommendation_rules.pkl", 'rb') as f:
+        items = sorted(pickle.load(f)['index'])
+    rng = random.Random(seed)
+    return [rng.sample(items, rng.randint(1, min(max_items, len(items)))) for _ in range(n_carts)]
+
+
+def benchmark_batch(base_url="http://localhost:5001", n_carts=2000, count=5):
+    """Throughput of batch requests vs one request per cart, against a running service"""
+    carts = _sample_carts(n_carts)
+
+    start_time = time.time()
+    single = []
+    with requests.Session() as session:
+        for cart in carts:
+            response = session.post(f"{base_url}/api/recommend/cart",
+                                    json={'item_ids': cart, 'count': count})
+            single.append(response.json()['recommendations'])
+    loop_time = time.time() - start_time
+
+    start_time = time.time()
+    batch = []
+    with requests.Session() as session:
+        for i in range(0, len(carts), MAX_BATCH_CARTS):
+            response = session.post(f"{base_url}/api/recommend/cart/batch", json={
+                'carts': [{'item_ids': cart, 'count': count} for cart in carts[i:i + MAX_BATCH_CARTS]]
+            })
+            batch.extend(result['recommendations'] for result in response.json()['results'])
+    batch_time = time.time() - start_time
+
+    mismatches = sum(a != b for a, b in zip(single, batch))
+    print(f"loop       {loop_time:8.2f} s  {n_carts / loop_time:10.1f} carts/s")
+    print(f"batch      {batch_time:8.2f} s  {n_carts / batch_time:10.1f} carts/s")
+    print(f"speedup    {loop_time / batch_time:8.1f}x  mismatches {mismatches}")
+
+
+BENCHMARKS = {
+    'memory': benchmark_memory,
+    'batch': benchmark_batch,
+}
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print(f"=== {name}")
+        BENCHMARKS[name]()
@@ -0,0 +1,85 @@
+"""
+Bounded LRU cache for cart recommendations
+"""
+import sys
+import threading
+from collections import OrderedDict
+
+
+class CartCache:
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Carts answered from the precomputed single-item table, counted here
+        # so the stats cover every lookup
+        self.precomputed_hits = 0
+
+    @staticmethod
+    def make_key(item_ids, count, version):
+        """Canonical key: the recommendations ignore item order and duplicates"""
+        return (tuple(sorted(set(item_ids))), count, version)
+
+    def get(self, key):
+        """Cached recommendations for the key, or None"""
+        with self._lock:
+            recommendations = self._entries.get(key)
+            if recommendations is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return recommendations
+
+    def record_precomputed_hit(self):
+        with self._lock:
+            self.precomputed_hits += 1
+
+    def put(self, key, recommendations):
+        with self._lock:
+            self._entries[key] = recommendations
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries = OrderedDict()
+            self.hits = 0
+            self.misses = 0
+            self.precomputed_hits = 0
+
+    def stats(self):
+        # Copy under the lock, measure outside it: walking every entry would
+        # otherwise block all lookups for the whole estimate
+        with self._lock:
+            entries = dict(self._entries)
+            hits, misses, precomputed_hits = self.hits, self.misses, self.precomputed_hits
+
+        lookups = hits + misses
+        all_lookups = lookups + precomputed_hits
+        return {
+            'size': len(entries),
+            'max_size': self.max_size,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / lookups, 4) if lookups else None,
+            'precomputed_hits': precomputed_hits,
+            'overall_hit_ratio': round((hits + precomputed_hits) / all_lookups, 4) if all_lookups else None,
+            'memory_bytes': estimate_size(entries)
+        }
+
+
+def estimate_size(entries):
+    """Approximate memory held by a mapping of cache keys to lists of item ids"""
+    size = sys.getsizeof(entries)
+    for key, value in entries.items():
+        if isinstance(key, tuple):
+            size += sys.getsizeof(key) + sys.getsizeof(key[0])
+            size += sum(sys.getsizeof(item) for item in key[0])
+        else:
+            size += sys.getsizeof(key)
+        size += sys.getsizeof(value) + sum(sys.getsizeof(item) for item in value)
+    return size
@@ -2,13 +2,10 @@
 Configuration settings for the recommendation system
 """
 
-# Database settings
-DB_CONFIG = {
-    'driver': '{SQL Server}',
-    'server': 'DESKTOP-QD57IO2\\SQLEXPRESS',
-    'database': 'B2C_DB',
-    'trusted_connection': 'yes'
-}
+# Data settings: database connection and snapshots live in ../shared_data
+# 'db' fetches order lines directly, 'snapshot' loads the latest shared snapshot
+# and tops it up with the orders placed since it was built
+DATA_SOURCE = 'db'
 
 # Model hyperparameters
 MODEL_CONFIG = {
@@ -17,8 +14,16 @@ MODEL_CONFIG = {
     'random_state': 42
 } 
 
+# Cart recommendation cache settings
+CACHE_CONFIG = {
+    'max_size': 50000,
+    # Precompute single-item carts at training time, for counts up to this
+    'precompute_count': 20  # 0 disables it
+}
+
 # Application settings
 DEFAULT_RECOMMENDATIONS = 5
+MAX_BATCH_CARTS = 1000  # larger /api/recommend/cart/batch requests get a 400
 
 #a9al men 0.05 
 # Performance monitoring settings
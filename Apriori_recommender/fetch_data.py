@@ -1,31 +1,69 @@
+import os
+import sys
+from collections import namedtuple
+
+import numpy as np
 import pandas as pd
-import pyodbc
-import sqlalchemy
-from config import DB_CONFIG
-
-def create_connection_string():
-    return (f"DRIVER={DB_CONFIG['driver']};"
-            f"SERVER={DB_CONFIG['server']};"
-            f"DATABASE={DB_CONFIG['database']};"
-            f"Trusted_Connection={DB_CONFIG['trusted_connection']};")
-
-def fetch_transactions():
-    conn_str = create_connection_string()
-    connection_url = f"mssql+pyodbc:///?odbc_connect={conn_str}"
-    engine = sqlalchemy.create_engine(connection_url)
-
-    query = """
-    SELECT 
-        DV.[DocPiece] AS order_id,
-        DVL.[LigneArtCode] AS item_id
-    FROM 
-        [B2C_DB].[dbo].[DocumentVentes] DV
-    JOIN 
-        [B2C_DB].[dbo].[DocumentVenteLignes] DVL 
-        ON DV.[DocPiece] = DVL.[LigneDocPiece]
-    """
 
-    df = pd.read_sql(query, engine)
+# The data layer is shared with the SVD service, one level up
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from shared_data.db import get_engine, fetch_watermark, order_lines_query, stream_order_lines, Vocabulary
+from shared_data.snapshot import load_snapshot
+
+# Order lines as integer codes into the order and item vocabularies, and the
+# ids of the orders at the watermark they were fetched up to
+Transactions = namedtuple('Transactions', ['order_codes', 'item_codes', 'orders', 'items', 'boundary'])
+
+def fetch_transactions(since=None, until=None):
+    """Fetch order lines, optionally only for orders in the [since, until] watermark range"""
+    engine = get_engine()
+    query, params = order_lines_query(engine, since, until)
+
+    df = pd.read_sql(query, engine, params=params)
     df['order_id'] = df['order_id'].astype(str)
     df['item_id'] = df['item_id'].astype(str)
     return df
+
+def stream_transactions(since=None, until=None, chunksize=None, exclude_orders=None):
+    """Stream order lines from the database as integer codes"""
+    order_codes, item_codes, orders, items, boundary = stream_order_lines(
+        since, until, chunksize, exclude_orders=exclude_orders)
+    return Transactions(order_codes, item_codes, orders.values, items.values, boundary)
+
+def load_snapshot_transactions():
+    """Order lines of the latest shared snapshot, topped up with the orders
+    placed since it was built, and the watermark they go up to.
+
+    The snapshot's code arrays are used as they are, memory-mapped, and the
+    newer orders are streamed from the database with item codes that
+    continue the snapshot's item vocabulary. Items that were only ever rated
+    get empty basket columns, which Apriori never counts as frequent.
+    Returns (None, None) if no snapshot exists.
+    """
+    snapshot = load_snapshot()
+    if snapshot is None:
+        return None, None
+
+    order_codes = np.asarray(snapshot.order_lines_order)
+    item_codes = np.asarray(snapshot.order_lines_item)
+    items = Vocabulary.from_values(snapshot.items)
+    n_orders = snapshot.n_orders
+    watermark, boundary = snapshot.watermark, snapshot.boundary_orders
+
+    latest = fetch_watermark()
+    if latest is not None and (watermark is None or latest >= watermark):
+        delta_orders, delta_items, orders, items, delta_boundary = stream_order_lines(
+            since=watermark, until=latest, items=items, exclude_orders=boundary)
+        if latest != watermark:
+            boundary = set()
+        boundary = boundary | delta_boundary
+        watermark = latest
+
+        if len(orders):
+            order_codes = np.concatenate([order_codes, delta_orders + n_orders])
+            item_codes = np.concatenate([item_codes, delta_items])
+            n_orders += len(orders)
+
+    transactions = Transactions(order_codes, item_codes, range(n_orders), items.values, boundary)
+    return transactions, watermark
@@ -0,0 +1,246 @@
+"""
+Association rule mining, with incremental maintenance of the frequent
+itemsets from new orders (negative border / FUP style)
+
+The run_* functions are the entry points of the background mining process:
+they fetch, mine, index and rank, and return plain picklable results.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from mlxtend.frequent_patterns import apriori, association_rules
+from fetch_data import stream_transactions, fetch_watermark, load_snapshot_transactions
+from ranking import rank_rules
+from config import MODEL_CONFIG, DATA_SOURCE
+
+
+def build_basket(df):
+    """Transform order lines into a one-hot order x item basket"""
+    basket = df.groupby(['order_id', 'item_id']).size().unstack(fill_value=0)
+    return basket.applymap(lambda x: 1 if x > 0 else 0)
+
+
+def build_basket_from_codes(transactions):
+    """Build a boolean order x item basket straight from streamed id codes"""
+    basket = np.zeros((len(transactions.orders), len(transactions.items)), dtype=bool)
+    basket[transactions.order_codes, transactions.item_codes] = True
+    return pd.DataFrame(basket, columns=transactions.items, copy=False)
+
+
+def is_frequent(count, n_transactions):
+    """Same support test as mlxtend's apriori"""
+    return n_transactions > 0 and count / n_transactions >= MODEL_CONFIG['min_support']
+
+
+def negative_border(frequent, items):
+    """Itemsets that are not frequent but whose immediate subsets all are"""
+    border = {frozenset([item]) for item in items} - frequent
+    frequent_items = [next(iter(s)) for s in frequent if len(s) == 1]
+    for itemset in frequent:
+        for item in frequent_items:
+            if item in itemset:
+                continue
+            candidate = itemset | {item}
+            if candidate in frequent or candidate in border:
+                continue
+            if all(candidate - {x} in frequent for x in candidate):
+                border.add(candidate)
+    return border
+
+
+def count_itemsets(basket, itemsets):
+    """Count the orders of the basket containing each itemset"""
+    columns = set(basket.columns)
+    item_counts = basket.sum(axis=0)
+    counts = {}
+    for itemset in itemsets:
+        if not itemset <= columns:
+            counts[itemset] = 0
+        elif len(itemset) == 1:
+            counts[itemset] = int(item_counts[next(iter(itemset))])
+        else:
+            counts[itemset] = int(basket[list(itemset)].all(axis=1).sum())
+    return counts
+
+
+def _generate_rules(frequent, counts, n_transactions):
+    """Build association rules from itemset counts, in mlxtend's itemset order"""
+    itemsets = sorted(frequent, key=lambda s: (len(s), sorted(s)))
+    frequent_itemsets = pd.DataFrame({
+        'support': [counts[s] / n_transactions for s in itemsets],
+        'itemsets': itemsets
+    })
+    return association_rules(
+        frequent_itemsets,
+        metric="lift",
+        min_threshold=MODEL_CONFIG['min_lift']
+    )
+
+
+def mine_rules(basket):
+    """Mine association rules from scratch.
+
+    Returns the rules and the mining state (itemset counts for the frequent
+    itemsets and their negative border) used by incremental updates.
+    """
+    n_transactions = len(basket)
+
+    # Generate frequent itemsets using Apriori algorithm
+    frequent_itemsets = apriori(
+        basket,
+        min_support=MODEL_CONFIG['min_support'],
+        use_colnames=True
+    )
+
+    frequent = set(frequent_itemsets['itemsets'])
+    border = negative_border(frequent, basket.columns)
+    counts = {
+        itemset: int(round(support * n_transactions))
+        for itemset, support in zip(frequent_itemsets['itemsets'], frequent_itemsets['support'])
+    }
+    counts.update(count_itemsets(basket, border))
+
+    # Rules come from the counts, exactly as in incremental updates
+    rules = _generate_rules(frequent, counts, n_transactions)
+
+    state = {
+        'n_transactions': n_transactions,
+        'frequent': frequent,
+        'counts': counts,
+        'watermark': None,
+        'boundary_orders': set()
+    }
+    return rules, state
+
+
+def update_rules(state, basket):
+    """Fold the basket of new orders into the mining state.
+
+    Returns the new rules and state, or None when an itemset of the negative
+    border became frequent: its supersets were never counted, so only a full
+    re-mine can give exact results.
+    """
+    n_transactions = state['n_transactions'] + len(basket)
+
+    # Items never seen before sit on the border with a zero count
+    counts = dict(state['counts'])
+    for item in basket.columns:
+        counts.setdefault(frozenset([item]), 0)
+
+    for itemset, count in count_itemsets(basket, counts.keys()).items():
+        counts[itemset] += count
+
+    if any(is_frequent(count, n_transactions)
+           for itemset, count in counts.items() if itemset not in state['frequent']):
+        return None
+
+    # No border itemset crossed the threshold, so the frequent itemsets can only shrink
+    frequent = {s for s in state['frequent'] if is_frequent(counts[s], n_transactions)}
+
+    # Every itemset on the new border was frequent or on the old border,
+    # so its count is already known
+    items = [next(iter(s)) for s in counts if len(s) == 1]
+    border = negative_border(frequent, items)
+
+    rules = _generate_rules(frequent, counts, n_transactions)
+    new_state = {
+        'n_transactions': n_transactions,
+        'frequent': frequent,
+        'counts': {s: counts[s] for s in frequent | border},
+        'watermark': state['watermark'],
+        'boundary_orders': state.get('boundary_orders', set())
+    }
+    return rules, new_state
+
+
+def build_rules_index(rules):
+    """Index of rules by antecedent item for faster lookup"""
+    rules_index = {}
+    for idx, antecedents in zip(rules.index, rules['antecedents']):
+        for item in antecedents:
+            if item not in rules_index:
+                rules_index[item] = []
+            rules_index[item].append(idx)
+    return rules_index
+
+
+def run_full_refresh():
+    """Mine the rules from scratch, from all orders up to the current watermark.
+
+    Returns (mode, rules, rules_index, state, ranking).
+    """
+    print("Building new recommendation rules...")
+    start_time = time.time()
+
+    # Step 1: Load transactions from the shared snapshot (topped up with the
+    # orders placed since it was built), or fetch them all from the database,
+    # in both cases up to the current watermark
+    transactions = None
+    if DATA_SOURCE == 'snapshot':
+        transactions, watermark = load_snapshot_transactions()
+        if transactions is None:
+            print("No data snapshot found, fetching from the database...")
+    if transactions is None:
+        watermark = fetch_watermark()
+        transactions = stream_transactions(until=watermark)
+
+    # Step 2: Mine frequent itemsets and association rules
+    rules, state = mine_rules(build_basket_from_codes(transactions))
+    state['watermark'] = watermark
+    state['boundary_orders'] = transactions.boundary
+
+    # Step 3: Build index and lift ranking for faster lookups
+    rules_index = build_rules_index(rules)
+    ranking = rank_rules(rules, rules_index)
+
+    build_time = time.time() - start_time
+    print(f"Rules generated in {build_time:.2f} seconds.")
+    print(f"Created {len(rules)} association rules.")
+    return 'full', rules, rules_index, state, ranking
+
+
+def run_incremental_refresh(state):
+    """Fold the orders placed since the state's watermark into the rules.
+
+    Returns (mode, rules, rules_index, state, ranking), where mode is
+    'incremental', 'full' when a full re-mine was needed instead, or
+    'up-to-date' when there was nothing to fold (rules, rules_index and
+    ranking are then None).
+    """
+    if state is None or state['watermark'] is None:
+        print("No incremental state available, running a full refresh...")
+        return run_full_refresh()
+
+    watermark = fetch_watermark()
+    if watermark is None or watermark < state['watermark']:
+        return 'up-to-date', None, None, state, None
+
+    # Orders may still come in at the last watermark value, so the range
+    # starts at it again and skips the orders already folded (states saved
+    # before boundary orders were tracked have none)
+    start_time = time.time()
+    seen = state.get('boundary_orders', set())
+    transactions = stream_transactions(since=state['watermark'], until=watermark, exclude_orders=seen)
+    boundary = transactions.boundary
+    if watermark == state['watermark']:
+        boundary = seen | boundary
+    if not transactions.orders:
+        return 'up-to-date', None, None, dict(state, watermark=watermark, boundary_orders=boundary), None
+
+    result = update_rules(state, build_basket_from_codes(transactions))
+    if result is None:
+        print("Negative border crossed the support threshold, running a full refresh...")
+        return run_full_refresh()
+
+    rules, state = result
+    state['watermark'] = watermark
+    state['boundary_orders'] = boundary
+    rules_index = build_rules_index(rules)
+    ranking = rank_rules(rules, rules_index)
+
+    build_time = time.time() - start_time
+    print(f"Folded {len(transactions.orders)} new orders in {build_time:.2f} seconds.")
+    print(f"Now {len(rules)} association rules.")
+    return 'incremental', rules, rules_index, state, ranking
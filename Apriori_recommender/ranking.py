@@ -0,0 +1,66 @@
+"""
+Lift ranking of association rules for cart lookups
+
+Built by the mining process next to the rules themselves, so publishing new
+rules in the service is a single reference swap.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from config import CACHE_CONFIG
+
+RuleRanking = namedtuple('RuleRanking', [
+    'index',  # item -> sorted lift ranks of the rules it triggers
+    'consequents',  # Rule consequents, strongest lift first
+    'single_item'  # item -> precomputed recommendations for a one-item cart
+])
+
+
+def rank_rules(rules, rules_index):
+    """Rank rules by lift once, so cart lookups only merge sorted rank arrays"""
+    # Stable sort: rules with the same lift keep their mining order
+    order = np.argsort(-rules['lift'].to_numpy(), kind='mergesort')
+    rank_of = {label: rank for rank, label in enumerate(rules.index[order])}
+
+    consequents = [tuple(c) for c in rules['consequents'].to_numpy()[order]]
+    index = {
+        item: np.sort(np.fromiter((rank_of[idx] for idx in indices), dtype=np.int64, count=len(indices)))
+        for item, indices in rules_index.items()
+    }
+
+    # Results for a count are a prefix of those for any larger count,
+    # so one list per item serves every count up to precompute_count
+    single_item = {}
+    if CACHE_CONFIG['precompute_count'] > 0:
+        for item in index:
+            single_item[item] = match_rules([item], CACHE_CONFIG['precompute_count'], index, consequents)
+
+    return RuleRanking(index, consequents, single_item)
+
+
+def match_rules(item_ids, count, ranked_index, ranked_consequents):
+    """Walk the rules triggered by the cart items, strongest lift first"""
+    # Use the index for faster lookup
+    matches = [ranked_index[item_id] for item_id in item_ids if item_id in ranked_index]
+
+    # If no matching rules found
+    if not matches:
+        return []
+
+    # Union of the triggered rules, already sorted by rank (i.e. by lift)
+    candidate_ranks = np.unique(np.concatenate(matches))
+
+    # Extract recommendations
+    cart = set(item_ids)
+    recommendations = []
+    for rank in candidate_ranks:
+        for item in ranked_consequents[rank]:
+            # Only add items not already in cart or recommendation list
+            if item not in cart and item not in recommendations:
+                recommendations.append(item)
+        # Stop once we have enough recommendations
+        if len(recommendations) >= count:
+            break
+
+    return recommendations[:count]
@@ -2,17 +2,47 @@ import pandas as pd
 import pickle
 import os
 import time
+import threading
+import uuid
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-from mlxtend.frequent_patterns import apriori, association_rules
-from fetch_data import fetch_transactions
-from config import MODEL_CONFIG, DEFAULT_RECOMMENDATIONS
+from cache import CartCache, estimate_size
+from mining import run_full_refresh, run_incremental_refresh
+from ranking import rank_rules, match_rules
+from config import DEFAULT_RECOMMENDATIONS, CACHE_CONFIG
+
+# Everything needed to serve carts from one set of rules. Snapshots are never
+# modified: a refresh builds a new one and swaps the engine's reference, so a
+# request always sees rules, index and ranking that belong together.
+RuleSnapshot = namedtuple('RuleSnapshot', [
+    'version',
+    'rules',
+    'rules_index',  # item -> rule labels, for faster lookups
+    'state',  # Itemset counts for incremental refresh
+    'index',  # item -> sorted lift ranks of the rules it triggers
+    'consequents',  # Rule consequents, strongest lift first
+    'single_item'  # item -> precomputed recommendations for a one-item cart
+])
 
 class RecommendationEngine:
     def __init__(self):
-        self.rules = None
-        self.rules_index = {}  # For faster lookups
+        self.snapshot = RuleSnapshot(0, None, {}, None, {}, [], {})
+        self.cache = CartCache(CACHE_CONFIG['max_size'])
         self.model_path = "saves/recommendation_rules.pkl"
-        
+
+        # Background refresh jobs
+        self.jobs = {}
+        self._jobs_lock = threading.Lock()
+        self._running_job = None
+        self._executor = None
+
+        # Mining processes import this module too, only the service loads rules
+        if multiprocessing.parent_process() is not None:
+            return
+
         # Try to load existing model first
         if os.path.exists(self.model_path):
             try:
@@ -20,9 +50,9 @@ class RecommendationEngine:
                 start_time = time.time()
                 with open(self.model_path, 'rb') as f:
                     model_data = pickle.load(f)
-                    self.rules = model_data['rules']
-                    self.rules_index = model_data['index']
-                
+                # Models saved before incremental refresh have no state
+                self._publish(model_data['rules'], model_data['index'], model_data.get('state'))
+
                 load_time = time.time() - start_time
                 print(f"Model loaded in {load_time:.2f} seconds.")
                 print(f"Loaded {len(self.rules)} association rules.")
@@ -33,109 +63,187 @@ class RecommendationEngine:
             print("No existing model found. Initializing new one...")
             self.initialize()
 
+    @property
+    def rules(self):
+        return self.snapshot.rules
+
+    @property
+    def rules_index(self):
+        return self.snapshot.rules_index
+
+    @property
+    def state(self):
+        return self.snapshot.state
+
     def initialize(self):
-        """Train the recommendation engine from scratch"""
-        print("Building new recommendation rules...")
-        start_time = time.time()
-        
-        # Step 1: Fetch transaction data from database
-        df = fetch_transactions()
-        
-        # Step 2: Transform data into basket format
-        basket = df.groupby(['order_id', 'item_id']).size().unstack(fill_value=0)
-        basket = basket.applymap(lambda x: 1 if x > 0 else 0)
-        
-        # Step 3: Generate frequent itemsets using Apriori algorithm
-        frequent_itemsets = apriori(
-            basket, 
-            min_support=MODEL_CONFIG['min_support'], 
-            use_colnames=True
-        )
-        
-        # Step 4: Create association rules from frequent itemsets
-        self.rules = association_rules(
-            frequent_itemsets, 
-            metric="lift", 
-            min_threshold=MODEL_CONFIG['min_lift']
-        )
-        
-        # Step 5: Build index for faster lookups
-        self._build_index()
-        
-        build_time = time.time() - start_time
-        print(f"Rules generated in {build_time:.2f} seconds.")
-        print(f"Created {len(self.rules)} association rules.")
-        
-        # Step 6: Save model to disk
-        self._save_model()
-    
-    def _build_index(self):
-        """Build an index of rules for faster lookup"""
-        self.rules_index = {}
-        for idx, rule in self.rules.iterrows():
-            antecedents = list(rule['antecedents'])
-            for item in antecedents:
-                if item not in self.rules_index:
-                    self.rules_index[item] = []
-                self.rules_index[item].append(idx)
-    
-    def _save_model(self):
+        """Train the recommendation engine from scratch, in this process"""
+        self._apply_refresh(*run_full_refresh())
+
+    def start_refresh(self, incremental=False):
+        """Start a full or incremental refresh in a background mining process.
+
+        Carts keep being served from the current rules until the new ones are
+        published. Returns the job id; if a refresh is already running, its
+        id is returned instead of starting another one.
+        """
+        with self._jobs_lock:
+            if self._running_job is not None:
+                return self._running_job
+
+            if self._executor is None:
+                # Spawn, not fork: a fork of this threaded process could inherit
+                # a lock held by another thread (e.g. stdout's) and deadlock,
+                # and would share the pooled database connections of the engine
+                self._executor = ProcessPoolExecutor(
+                    max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+            if incremental:
+                future = self._executor.submit(run_incremental_refresh, self.state)
+            else:
+                future = self._executor.submit(run_full_refresh)
+
+            job_id = uuid.uuid4().hex
+            self.jobs[job_id] = {
+                'job_id': job_id,
+                'kind': 'incremental' if incremental else 'full',
+                'status': 'running',
+                'mode': None,
+                'rules': None,
+                'error': None,
+                'started_at': time.time(),
+                'processing_time_ms': None
+            }
+            self._running_job = job_id
+
+        future.add_done_callback(lambda f: self._finish_job(job_id, f))
+        return job_id
+
+    def get_job(self, job_id):
+        with self._jobs_lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _finish_job(self, job_id, future):
+        """Publish the result of a background refresh and record the job outcome"""
+        try:
+            mode, rules, rules_index, state, ranking = future.result()
+            self._apply_refresh(mode, rules, rules_index, state, ranking)
+            update = {'status': 'done', 'mode': mode, 'rules': len(self.rules)}
+        except Exception as e:
+            print(f"[ERROR] Background refresh {job_id} failed: {e}")
+            update = {'status': 'failed', 'error': str(e)}
+            if isinstance(e, BrokenProcessPool):
+                self._executor = None
+
+        with self._jobs_lock:
+            job = self.jobs[job_id]
+            job.update(update)
+            job['processing_time_ms'] = round((time.time() - job['started_at']) * 1000, 2)
+            self._running_job = None
+
+    def _apply_refresh(self, mode, rules, rules_index, state, ranking):
+        if rules is None:
+            # Nothing new to mine, only the watermark moved
+            self.snapshot = self.snapshot._replace(state=state)
+        else:
+            self._publish(rules, rules_index, state, ranking)
+        self._save_model(self.snapshot)
+
+    def _publish(self, rules, rules_index, state, ranking=None):
+        """Swap in a snapshot of the new rules with one assignment.
+
+        The mining process ranks the rules itself; only rules loaded from
+        disk are ranked here.
+        """
+        if ranking is None:
+            ranking = rank_rules(rules, rules_index)
+
+        # A new version means cached results of the previous rules can never
+        # be served again, the clear only frees their memory
+        self.snapshot = RuleSnapshot(self.snapshot.version + 1, rules, rules_index, state, *ranking)
+        self.cache.clear()
+
+    def _save_model(self, snapshot):
         """Save the model to disk using pickle"""
         try:
             # Package the rules and index together
             model_data = {
-                'rules': self.rules,
-                'index': self.rules_index
+                'rules': snapshot.rules,
+                'index': snapshot.rules_index,
+                'state': snapshot.state
             }
-            
-            # Save to a pickle file
-            with open(self.model_path, 'wb') as f:
+
+            # Save to a temporary file first so readers never see a partial model
+            tmp_path = self.model_path + ".tmp"
+            with open(tmp_path, 'wb') as f:
                 pickle.dump(model_data, f)
-            
+            os.replace(tmp_path, self.model_path)
+
             print(f"Model saved successfully to {self.model_path}")
         except Exception as e:
             print(f"Failed to save model: {e}")
 
     def get_recommendations(self, item_ids, count=5):
         """Get recommendations based on items in cart"""
+        snapshot = self.snapshot
+
         # Return empty list if no rules or no items
-        if self.rules is None or not item_ids:
+        if snapshot.rules is None or not item_ids:
             return []
-        
+
         # Clean and standardize item_ids
         item_ids = [str(i).strip() for i in item_ids if i]
         if not item_ids:  # If after cleaning we have no items
             return []
-        
-        # Use the index for faster lookup
-        candidate_indices = set()
-        for item_id in item_ids:
-            if item_id in self.rules_index:
-                candidate_indices.update(self.rules_index[item_id])
-        
-        # If no matching rules found
-        if not candidate_indices:
-            return []
-        
-        # Get the candidate rules using the indices
-        candidate_rules = self.rules.loc[list(candidate_indices)]
-        
-        # Sort by lift (higher lift = stronger association)
-        sorted_rules = candidate_rules.sort_values(by='lift', ascending=False)
-        
-        # Extract recommendations
-        recommendations = []
-        for _, rule in sorted_rules.iterrows():
-            consequents = list(rule['consequents'])
-            for item in consequents:
-                # Only add items not already in cart or recommendation list
-                if item not in item_ids and item not in recommendations:
-                    recommendations.append(item)
-            # Stop once we have enough recommendations
-            if len(recommendations) >= count:
-                break
-        
-        return recommendations[:count]
+
+        return self._cached_recommendations(item_ids, count, snapshot)
+
+    def get_batch_recommendations(self, carts):
+        """Get recommendations for many carts at once.
+
+        carts is a list of (item_ids, count) pairs. Returns the recommendations
+        and the processing time in ms of each cart, in order.
+        """
+        # Read the snapshot once so the whole batch sees the same rules
+        snapshot = self.snapshot
+
+        results, timings = [], []
+        for item_ids, count in carts:
+            start_time = time.time()
+            item_ids = [str(i).strip() for i in item_ids if i] if item_ids else []
+            if snapshot.rules is None or not item_ids:
+                recommendations = []
+            else:
+                recommendations = self._cached_recommendations(item_ids, count, snapshot)
+            results.append(recommendations)
+            timings.append((time.time() - start_time) * 1000)
+        return results, timings
+
+    def cache_stats(self):
+        """Hit ratio and memory use of the cart cache and the precomputed single-item table"""
+        snapshot = self.snapshot
+        return {
+            'version': snapshot.version,
+            'cache': self.cache.stats(),
+            'single_item': {
+                'items': len(snapshot.single_item),
+                'max_count': CACHE_CONFIG['precompute_count'],
+                'memory_bytes': estimate_size(snapshot.single_item)
+            }
+        }
+
+    def _cached_recommendations(self, item_ids, count, snapshot):
+        key = CartCache.make_key(item_ids, count, snapshot.version)
+        cart = key[0]
+
+        if len(cart) == 1 and count <= CACHE_CONFIG['precompute_count']:
+            self.cache.record_precomputed_hit()
+            return snapshot.single_item.get(cart[0], [])[:count]
+
+        recommendations = self.cache.get(key)
+        if recommendations is None:
+            recommendations = match_rules(cart, count, snapshot.index, snapshot.consequents)
+            self.cache.put(key, recommendations)
+        return list(recommendations)
 
 # Global instance
-recommendation_engine = RecommendationEngine()
\ No newline at end of file
+recommendation_engine = RecommendationEngine()
@@ -0,0 +1,66 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# The service modules import each other as top-level modules, and the
+# shared data layer lives at the repository root. Both services have a
+# top-level config module, so drop the other service's if it was loaded first
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, '..', '..'))
+sys.path.insert(0, os.path.join(TESTS_DIR, '..'))
+sys.modules.pop('config', None)
+
+SCHEMA = """
+CREATE TABLE DocumentVentes (DocPiece TEXT PRIMARY KEY, DocDate TEXT);
+CREATE TABLE DocumentVenteLignes (LigneDocPiece TEXT, LigneArtCode TEXT);
+CREATE TABLE Clients (TiersId TEXT PRIMARY KEY, TiersCode TEXT);
+CREATE TABLE Articles (ArtId TEXT PRIMARY KEY, ArtCode TEXT);
+CREATE TABLE Ratings (UserId TEXT, ProductId TEXT, Stars REAL);
+"""
+
+
+class StandInDB:
+    """SQLite stand-in for the B2C database, with the tables the services read"""
+
+    def __init__(self, path):
+        self.path = path
+        self._execute(lambda conn: conn.executescript(SCHEMA))
+
+    def _execute(self, fn):
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                fn(conn)
+        finally:
+            conn.close()
+
+    def add_order(self, order_id, doc_date, items):
+        def insert(conn):
+            conn.execute("INSERT INTO DocumentVentes VALUES (?, ?)", (order_id, doc_date))
+            conn.executemany("INSERT INTO DocumentVenteLignes VALUES (?, ?)",
+                             [(order_id, item) for item in items])
+        self._execute(insert)
+
+    def add_rating(self, user_id, item_id, stars):
+        def insert(conn):
+            conn.execute("INSERT OR IGNORE INTO Clients VALUES (?, ?)", (user_id, user_id))
+            conn.execute("INSERT OR IGNORE INTO Articles VALUES (?, ?)", (item_id, item_id))
+            conn.execute("INSERT INTO Ratings VALUES (?, ?, ?)", (user_id, item_id, stars))
+        self._execute(insert)
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    """Point the shared engine at a fresh SQLite stand-in database"""
+    db = pytest.importorskip('shared_data.db')
+    path = tmp_path / 'b2c.db'
+    stand_in = StandInDB(str(path))
+
+    monkeypatch.setitem(db.ENGINE_CONFIG, 'url', f"sqlite:///{path}")
+    monkeypatch.setattr(db, '_engine', None)
+    yield stand_in
+
+    if db._engine is not None:
+        db._engine.dispose()
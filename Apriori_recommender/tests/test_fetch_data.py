@@ -0,0 +1,62 @@
+import pytest
+
+pytest.importorskip('pandas')
+pytest.importorskip('sqlalchemy')
+
+from fetch_data import fetch_transactions, fetch_watermark, stream_transactions
+
+
+def pairs(transactions):
+    """Order lines of streamed transactions, decoded back to ids"""
+    return sorted((transactions.orders[o], transactions.items[i])
+                  for o, i in zip(transactions.order_codes, transactions.item_codes))
+
+
+def test_stream_transactions_matches_fetch(sqlite_db):
+    sqlite_db.add_order('DOC1', '2024-01-01', ['ART1', 'ART2'])
+    sqlite_db.add_order('DOC2', '2024-01-01', ['ART2'])
+    sqlite_db.add_order('DOC3', '2024-01-02', ['ART3', 'ART1', 'ART2'])
+
+    # Chunks smaller than the data, so codes must carry across chunks
+    transactions = stream_transactions(chunksize=2)
+    df = fetch_transactions()
+
+    assert pairs(transactions) == sorted(zip(df['order_id'], df['item_id']))
+    assert len(transactions.orders) == 3
+    assert sorted(transactions.items) == ['ART1', 'ART2', 'ART3']
+
+
+def test_watermark_range_keeps_late_orders_at_the_watermark(sqlite_db):
+    sqlite_db.add_order('DOC1', '2024-01-01', ['ART1'])
+    sqlite_db.add_order('DOC2', '2024-01-02', ['ART2'])
+
+    watermark = fetch_watermark()
+    transactions = stream_transactions(until=watermark)
+    assert transactions.boundary == {'DOC2'}
+
+    # Saved after the first run, on the watermark date and after it
+    sqlite_db.add_order('DOC3', '2024-01-02', ['ART1', 'ART3'])
+    sqlite_db.add_order('DOC4', '2024-01-03', ['ART2'])
+
+    delta = stream_transactions(since=watermark, until=fetch_watermark(),
+                                exclude_orders=transactions.boundary)
+    assert pairs(delta) == [('DOC3', 'ART1'), ('DOC3', 'ART3'), ('DOC4', 'ART2')]
+    assert delta.boundary == {'DOC4'}
+
+
+def test_orders_after_until_are_left_out(sqlite_db):
+    sqlite_db.add_order('DOC1', '2024-01-01', ['ART1'])
+    sqlite_db.add_order('DOC2', '2024-01-03', ['ART2'])
+
+    transactions = stream_transactions(until='2024-01-02')
+    assert pairs(transactions) == [('DOC1', 'ART1')]
+    assert transactions.boundary == set()
+
+
+def test_full_fetch_keeps_orders_without_a_date(sqlite_db):
+    sqlite_db.add_order('DOC1', '2024-01-01', ['ART1'])
+    sqlite_db.add_order('DOC2', None, ['ART2'])
+
+    watermark = fetch_watermark()
+    assert pairs(stream_transactions(until=watermark)) == [('DOC1', 'ART1'), ('DOC2', 'ART2')]
+    assert pairs(stream_transactions(since=watermark, until=watermark)) == [('DOC1', 'ART1')]
@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+pytest.importorskip('mlxtend')
+pytest.importorskip('sqlalchemy')
+
+from config import MODEL_CONFIG
+from mining import build_basket, mine_rules, update_rules
+
+ITEMS = [f"ART{i}" for i in range(8)]
+RULE_COLUMNS = ['antecedents', 'consequents', 'support', 'confidence', 'lift']
+
+
+@pytest.fixture(autouse=True)
+def thresholds(monkeypatch):
+    monkeypatch.setitem(MODEL_CONFIG, 'min_support', 0.1)
+    monkeypatch.setitem(MODEL_CONFIG, 'min_lift', 1.0)
+
+
+def random_orders(rng, n_orders, start=0):
+    """Order lines of n_orders random orders, with ids from start on"""
+    rows = []
+    for order in range(start, start + n_orders):
+        for item in rng.sample(ITEMS, rng.randint(1, 4)):
+            rows.append({'order_id': f"DOC{order}", 'item_id': item})
+    return pd.DataFrame(rows)
+
+
+def orders_of(*itemsets, start=0):
+    """Order lines of one order per itemset"""
+    rows = [{'order_id': f"DOC{start + i}", 'item_id': item}
+            for i, itemset in enumerate(itemsets) for item in itemset]
+    return pd.DataFrame(rows)
+
+
+def test_update_matches_full_mine_on_random_baskets():
+    rng = random.Random(42)
+    compared = 0
+
+    for _ in range(40):
+        old = random_orders(rng, 200)
+        new = random_orders(rng, rng.randint(1, 40), start=200)
+
+        _, state = mine_rules(build_basket(old))
+        result = update_rules(state, build_basket(new))
+        if result is None:
+            continue
+        compared += 1
+
+        updated_rules, updated_state = result
+        expected_rules, expected_state = mine_rules(build_basket(pd.concat([old, new])))
+
+        assert updated_state['n_transactions'] == expected_state['n_transactions']
+        assert updated_state['frequent'] == expected_state['frequent']
+        assert updated_state['counts'] == expected_state['counts']
+        pd.testing.assert_frame_equal(
+            updated_rules[RULE_COLUMNS].reset_index(drop=True),
+            expected_rules[RULE_COLUMNS].reset_index(drop=True)
+        )
+
+    assert compared > 0
+
+
+def test_border_itemset_crossing_threshold_returns_none():
+    # ART1 sits on the negative border with 1 order in 20
+    old = orders_of(*[['ART0']] * 19, ['ART0', 'ART1'])
+    _, state = mine_rules(build_basket(old))
+    assert frozenset(['ART1']) in state['counts']
+    assert frozenset(['ART1']) not in state['frequent']
+
+    new = orders_of(*[['ART0', 'ART1']] * 10, start=20)
+    assert update_rules(state, build_basket(new)) is None
+
+
+def test_new_item_crossing_threshold_returns_none():
+    old = orders_of(*[['ART0', 'ART1']] * 10)
+    _, state = mine_rules(build_basket(old))
+
+    new = orders_of(*[['ART0', 'ART9']] * 5, start=10)
+    assert update_rules(state, build_basket(new)) is None
+
+
+def test_update_below_threshold_shrinks_frequent_itemsets():
+    old = orders_of(*[['ART0', 'ART1']] * 2, *[['ART0']] * 8)
+    _, state = mine_rules(build_basket(old))
+    assert frozenset(['ART0', 'ART1']) in state['frequent']
+
+    # 2 orders in 30 fall below the 10% support
+    new = orders_of(*[['ART0']] * 20, start=10)
+    result = update_rules(state, build_basket(new))
+    assert result is not None
+
+    rules, state = result
+    assert state['n_transactions'] == 30
+    assert frozenset(['ART0', 'ART1']) not in state['frequent']
+    assert frozenset(['ART1']) not in state['frequent']
@@ -0,0 +1,35 @@
+import pytest
+
+pd = pytest.importorskip('pandas')
+pytest.importorskip('mlxtend')
+pytest.importorskip('sqlalchemy')
+
+from mining import build_rules_index
+from ranking import rank_rules, match_rules
+
+
+def make_rules():
+    return pd.DataFrame({
+        'antecedents': [frozenset(['ART1']), frozenset(['ART1']), frozenset(['ART2']), frozenset(['ART1'])],
+        'consequents': [frozenset(['ART2']), frozenset(['ART3']), frozenset(['ART1']), frozenset(['ART4'])],
+        'lift': [1.5, 3.0, 1.5, 1.5]
+    })
+
+
+def test_rules_are_matched_strongest_lift_first():
+    rules = make_rules()
+    ranking = rank_rules(rules, build_rules_index(rules))
+
+    # Equal lifts keep their mining order
+    assert match_rules(['ART1'], 3, ranking.index, ranking.consequents) == ['ART3', 'ART2', 'ART4']
+    assert match_rules(['ART1', 'ART2'], 5, ranking.index, ranking.consequents) == ['ART3', 'ART4']
+    assert match_rules(['ART9'], 5, ranking.index, ranking.consequents) == []
+
+
+def test_single_item_precompute_matches_lookups():
+    rules = make_rules()
+    ranking = rank_rules(rules, build_rules_index(rules))
+
+    assert set(ranking.single_item) == {'ART1', 'ART2'}
+    for item, recommendations in ranking.single_item.items():
+        assert recommendations[:2] == match_rules([item], 2, ranking.index, ranking.consequents)
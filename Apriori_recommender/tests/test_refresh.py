@@ -0,0 +1,113 @@
+import os
+
+import pytest
+
+pytest.importorskip('pandas')
+pytest.importorskip('mlxtend')
+pytest.importorskip('sqlalchemy')
+
+import mining
+from config import MODEL_CONFIG
+from shared_data.config import SNAPSHOT_CONFIG
+import shared_data.snapshot as snapshot_module
+from shared_data.snapshot import build_snapshot, snapshot_info
+
+
+@pytest.fixture(autouse=True)
+def thresholds(monkeypatch):
+    monkeypatch.setitem(MODEL_CONFIG, 'min_support', 0.3)
+    monkeypatch.setitem(MODEL_CONFIG, 'min_lift', 1.0)
+
+
+@pytest.fixture
+def snapshot_source(sqlite_db, tmp_path, monkeypatch):
+    """Snapshot data source over the stand-in database, with a first snapshot built"""
+    sqlite_db.add_order('DOC1', '2024-01-01', ['ART1', 'ART2'])
+    sqlite_db.add_order('DOC2', '2024-01-01', ['ART1', 'ART2'])
+    sqlite_db.add_order('DOC3', '2024-01-01', ['ART1'])
+    sqlite_db.add_order('DOC4', '2024-01-01', ['ART1', 'ART3'])
+    # Rated but never ordered, so its basket column stays empty
+    sqlite_db.add_rating('CLI1', 'ART9', 4)
+
+    monkeypatch.setitem(SNAPSHOT_CONFIG, 'root', str(tmp_path / 'snapshots'))
+    monkeypatch.setattr(mining, 'DATA_SOURCE', 'snapshot')
+    build_snapshot()
+    return sqlite_db
+
+
+def test_full_refresh_folds_orders_placed_after_the_snapshot(snapshot_source, monkeypatch):
+    # One order on the snapshot's watermark date, one after it
+    snapshot_source.add_order('DOC5', '2024-01-01', ['ART2', 'ART3'])
+    snapshot_source.add_order('DOC6', '2024-01-02', ['ART3'])
+
+    mode, rules, rules_index, state, ranking = mining.run_full_refresh()
+    assert mode == 'full'
+    assert state['n_transactions'] == 6
+    assert state['watermark'] == '2024-01-02'
+    assert state['boundary_orders'] == {'DOC6'}
+    assert state['counts'][frozenset(['ART3'])] == 3
+
+    # Same result as mining every order straight from the database
+    monkeypatch.setattr(mining, 'DATA_SOURCE', 'db')
+    _, db_rules, _, db_state, _ = mining.run_full_refresh()
+    assert state['frequent'] == db_state['frequent']
+    assert {s: c for s, c in state['counts'].items() if c} == \
+        {s: c for s, c in db_state['counts'].items() if c}
+    assert len(rules) == len(db_rules)
+
+
+def test_incremental_fallback_keeps_orders_placed_after_the_snapshot(snapshot_source):
+    _, _, _, state, _ = mining.run_full_refresh()
+    assert state['n_transactions'] == 4
+    assert frozenset(['ART3']) not in state['frequent']
+
+    # ART3 crosses the support threshold, so the incremental update falls
+    # back to a full refresh, which must not revert to the snapshot's orders
+    snapshot_source.add_order('DOC5', '2024-01-01', ['ART1', 'ART3'])
+    snapshot_source.add_order('DOC6', '2024-01-02', ['ART3'])
+    snapshot_source.add_order('DOC7', '2024-01-02', ['ART1', 'ART3'])
+
+    mode, rules, rules_index, state, ranking = mining.run_incremental_refresh(state)
+    assert mode == 'full'
+    assert state['n_transactions'] == 7
+    assert state['watermark'] == '2024-01-02'
+    assert frozenset(['ART3']) in state['frequent']
+
+    # Nothing new since: the next incremental run is up to date
+    mode, rules, _, state, ranking = mining.run_incremental_refresh(state)
+    assert mode == 'up-to-date'
+    assert rules is None
+    assert ranking is None
+    assert state['n_transactions'] == 7
+
+
+def test_quick_rebuilds_get_distinct_versions(snapshot_source, tmp_path):
+    first = build_snapshot()
+    second = build_snapshot()
+    assert first != second
+
+    root = tmp_path / 'snapshots'
+    assert not [d for d in os.listdir(root) if d.endswith('.tmp')]
+    assert (root / 'CURRENT').read_text() == second
+
+
+def test_failed_build_leaves_no_partial_snapshot(snapshot_source, tmp_path, monkeypatch):
+    root = tmp_path / 'snapshots'
+    current = (root / 'CURRENT').read_text()
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(snapshot_module.np, 'save', fail)
+
+    with pytest.raises(OSError):
+        build_snapshot()
+    assert not [d for d in os.listdir(root) if d.endswith('.tmp')]
+    assert (root / 'CURRENT').read_text() == current
+
+
+def test_snapshot_info_reports_version_and_horizon(snapshot_source, tmp_path):
+    info = snapshot_info()
+    assert info['version'] == (tmp_path / 'snapshots' / 'CURRENT').read_text()
+    assert info['watermark'] == '2024-01-01'
+    assert info['n_order_lines'] == 7
+    assert info['age_s'] >= 0
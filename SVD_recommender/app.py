@@ -5,9 +5,11 @@ from flask import Flask, request, jsonify
 import time
 
 # Import project modules
-from database import fetch_data_from_db
+from database import fetch_ratings, data_source_info
 from models.svd_model import create_svd_model, load_svd_model
-from recommender import RecommenderService
+from models.item_neighbors import build_item_neighbors, save_item_neighbors, load_item_neighbors
+from models.candidates import load_candidate_generator
+from recommender import RecommenderService, CF_MODES
 from config import DEFAULT_RECOMMENDATIONS, Minimum_CTR
 from ctr_monitor import get_ctr_last_7_days
 
@@ -18,19 +20,28 @@ app = Flask(__name__)
 df = None
 recommender_service = None
 svd_model = None
+item_neighbors = None
 
-def initialize_system(force_retrain=False):
+def build_neighbors():
+    """Compute and save the item-item neighbour table used by the item CF mode"""
+    neighbors = build_item_neighbors(df)
+    save_item_neighbors(neighbors)
+    print(f"[SYSTEM] Item neighbour table built for {len(neighbors.items)} items")
+    return neighbors
+
+def initialize_system(force_retrain=False, refresh_snapshot=False):
     """Initialize the recommendation system by loading data and training or loading the model"""
-    global df, recommender_service, svd_model
+    global df, recommender_service, svd_model, item_neighbors
 
-    # Fetch data
-    df = fetch_data_from_db()
+    # Fetch data (rebuilding the shared snapshot first on refreshes)
+    df = fetch_ratings(refresh_snapshot)
 
     if not df.empty:
         if force_retrain:
             # Force retrain the model
             svd_model = create_svd_model(df, save_to_disk=True)
             print("[SYSTEM] SVD model forcibly retrained")
+            item_neighbors = build_neighbors()
         else:
             # Try to load the model from disk
             svd_model = load_svd_model()
@@ -40,21 +51,27 @@ def initialize_system(force_retrain=False):
                 svd_model = create_svd_model(df, save_to_disk=True)
                 print("[SYSTEM] New SVD model trained and saved")
 
-        # Initialize the recommendation service
-        recommender_service = RecommenderService(df, svd_model)
+            item_neighbors = load_item_neighbors()
+            if item_neighbors is None:
+                item_neighbors = build_neighbors()
+
+        # Initialize the recommendation service, with candidates from the latest Apriori rules
+        recommender_service = RecommenderService(df, svd_model, item_neighbors, load_candidate_generator())
         return True
     else:
         return False
 
 def retrain_model():
     """Retrain just the SVD model without reloading data"""
-    global df, recommender_service, svd_model
+    global df, recommender_service, svd_model, item_neighbors
     
     if df is not None and not df.empty:
         # Retrain the model with existing data
         svd_model = create_svd_model(df, save_to_disk=True)
+        item_neighbors = build_neighbors()
         # Update the recommender service with the new model
-        recommender_service = RecommenderService(df, svd_model)
+        recommender_service = RecommenderService(df, svd_model, item_neighbors,
+                                                 recommender_service.candidate_generator)
         return True
     else:
         return False
@@ -64,14 +81,18 @@ def recommend():
     # Get parameters from request
     user_id = request.args.get('user_id')
     n = int(request.args.get('n', DEFAULT_RECOMMENDATIONS))
+    cf_mode = request.args.get('cf_mode')
     
     if not user_id:
         return jsonify({'error': 'Missing user_id parameter'}), 400
+
+    if cf_mode is not None and cf_mode not in CF_MODES:
+        return jsonify({'error': f"cf_mode must be one of {', '.join(CF_MODES)}"}), 400
     
     if recommender_service is None:
         return jsonify({'error': 'Recommendation system not initialized'}), 503
 
-    response_data = recommender_service.get_top_products(user_id, n)
+    response_data = recommender_service.get_top_products(user_id, n, cf_mode)
     return jsonify(response_data)
 
 @app.route('/refresh', methods=['POST'])
@@ -86,13 +107,13 @@ def refresh_data():
     if ctr is not None:
         if ctr < Minimum_CTR:
             print("[CTR MONITOR] Low CTR detected, refreshing entire recommendation system...")
-            success = initialize_system(force_retrain=True)
+            success = initialize_system(force_retrain=True, refresh_snapshot=True)
         else:
             print("[CTR MONITOR] CTR is acceptable, refreshing data only...")
-            success = initialize_system(force_retrain=False)
+            success = initialize_system(force_retrain=False, refresh_snapshot=True)
     else:
         print("[CTR MONITOR] CTR could not be retrieved, refreshing data only...")
-        success = initialize_system(force_retrain=False)
+        success = initialize_system(force_retrain=False, refresh_snapshot=True)
     
     if success:
 
@@ -108,6 +129,7 @@ def refresh_data():
             'status': model_status,
             'ctr': None if ctr is None else round(ctr, 5),
             'message': message,
+            'data': data_source_info()
         })
     
     return jsonify({'status': 'error'}), 500
@@ -138,13 +160,11 @@ def light_refresh():
     """Lightweight refresh: update df and recommender without retraining"""
     global df, recommender_service
 
-    df = fetch_data_from_db()
+    df = fetch_ratings(refresh_snapshot=True)
     if not df.empty:
-        recommender_service.df = df
-        recommender_service.user_item_matrix = df.pivot_table(
-            index='user_id', columns='item_id', values='rating', fill_value=0
-        )
-        return jsonify({'status': 'success', 'message': 'Data and user matrix refreshed'})
+        recommender_service.set_data(df)
+        return jsonify({'status': 'success', 'message': 'Data and user matrix refreshed',
+                        'data': data_source_info()})
     else:
         return jsonify({'status': 'error', 'message': 'No data found in DB'}), 500
 
@@ -0,0 +1,105 @@
+"""
+Benchmarks for the SVD recommendation service
+
+Usage: python benchmark.py [cf] [candidates]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from database import fetch_ratings
+from models.svd_model import create_svd_model, load_svd_model
+from models.item_neighbors import build_item_neighbors, load_item_neighbors
+from models.candidates import load_candidate_generator
+from recommender import RecommenderService
+from config import CANDIDATE_CONFIG
+
+
+def _load_service():
+    """Recommender service over the current data, model and neighbour table"""
+    df = fetch_ratings()
+    svd_model = load_svd_model() or create_svd_model(df, save_to_disk=False)
+
+    item_neighbors = load_item_neighbors()
+    if item_neighbors is None:
+        start_time = time.time()
+        item_neighbors = build_item_neighbors(df)
+        print(f"item neighbour table built in {time.time() - start_time:.2f} s")
+
+    return RecommenderService(df, svd_model, item_neighbors, load_candidate_generator())
+
+
+def _sample_users(service, n_users, seed=42):
+    users = sorted(service.user_item_matrix.index)
+    return random.Random(seed).sample(users, min(n_users, len(users)))
+
+
+def _time_requests(fn, users):
+    """Latency in ms of fn(user) for every user"""
+    latencies = []
+    for user_id in users:
+        start_time = time.time()
+        fn(user_id)
+        latencies.append((time.time() - start_time) * 1000)
+    return np.array(latencies)
+
+
+def _report(name, latencies):
+    print(f"{name:<10} mean {latencies.mean():8.2f} ms  "
+          f"p50 {np.percentile(latencies, 50):8.2f} ms  "
+          f"p95 {np.percentile(latencies, 95):8.2f} ms")
+
+
+def benchmark_cf(n_users=200, n=5):
+    """Request latency of the user-based vs the item-based CF mode"""
+    service = _load_service()
+    users = _sample_users(service, n_users)
+
+    for cf_mode in ('user', 'item'):
+        latencies = _time_requests(lambda u: service.get_recommendations(u, n, cf_mode=cf_mode), users)
+        _report(cf_mode, latencies)
+
+
+def benchmark_candidates(n_users=200, n=5, sizes=(100, 300, 1000)):
+    """Latency and recall@n of candidate re-ranking vs full-catalog scoring"""
+    service = _load_service()
+    if service.candidate_generator is None:
+        print("No association rules found, run the Apriori service first")
+        return
+    users = _sample_users(service, n_users)
+
+    full = {}
+    latencies = _time_requests(
+        lambda u: full.setdefault(u, service.get_recommendations(u, n, use_candidates=False)), users)
+    _report('full', latencies)
+
+    for size in sizes:
+        reranked = {}
+        original_size = CANDIDATE_CONFIG['size']
+        CANDIDATE_CONFIG['size'] = size
+        try:
+            latencies = _time_requests(
+                lambda u: reranked.setdefault(u, service.get_recommendations(u, n, use_candidates=True)), users)
+        finally:
+            CANDIDATE_CONFIG['size'] = original_size
+
+        recall = np.mean([
+            len({i for i, _ in reranked[u]} & {i for i, _ in full[u]}) / max(len(full[u]), 1)
+            for u in users
+        ])
+        _report(f"top-{size}", latencies)
+        print(f"{'':<10} recall@{n} vs full catalog {recall:.3f}")
+
+
+BENCHMARKS = {
+    'cf': benchmark_cf,
+    'candidates': benchmark_candidates,
+}
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print(f"=== {name}")
+        BENCHMARKS[name]()
@@ -2,13 +2,9 @@
 Configuration settings for the recommendation system
 """
 
-# Database settings
-DB_CONFIG = {
-    'driver': '{SQL Server}',
-    'server': 'DESKTOP-QD57IO2\\SQLEXPRESS',
-    'database': 'B2C_DB',
-    'trusted_connection': 'yes'
-}
+# Data settings: database connection and snapshots live in ../shared_data
+# 'db' fetches ratings directly, 'snapshot' loads the latest shared snapshot
+DATA_SOURCE = 'db'
 
 # Model hyperparameters
 MODEL_CONFIG = {
@@ -19,6 +15,43 @@ MODEL_CONFIG = {
     'random_state': 69
 }
 
+# Hyperparameter search settings (see tuning.py)
+TUNING_CONFIG = {
+    'grid': {
+        'n_factors': [50, 100, 150, 250],
+        'lr_all': [0.005, 0.01],
+        'reg_all': [0.02, 0.05, 0.1]
+    },
+    'max_epochs': 40,
+    'epoch_step': 5,  # validation checkpoint every epoch_step epochs
+    'patience': 2,  # checkpoints without improvement before stopping
+    'precision_k': 10,
+    'relevance_threshold': 4.0,
+    'rmse_tolerance': 0.01,  # relative RMSE loss accepted for a cheaper configuration
+    'latency_users': 50,
+    'latency_repeats': 5,  # serving latency is the median over repeats
+    'n_workers': None,  # None = one per CPU
+    'report_path': 'tuning_report.json'
+}
+
+# Collaborative filtering settings
+CF_CONFIG = {
+    'mode': 'user',  # 'user': similar users at request time, 'item': precomputed item neighbours
+    'item_neighbors': 50,
+    'block_size': 1024,  # items per task when building the neighbour table
+    'n_jobs': None,  # worker processes, None = one per CPU
+    # Similarity mass added to every item-mode score's denominator, so items
+    # reached through weak links rank below items many strong links point to
+    'item_shrinkage': 1.0
+}
+
+# Candidate generation settings (two-stage ranking)
+CANDIDATE_CONFIG = {
+    'enabled': False,  # score only the candidates instead of the whole catalog
+    'size': 300,  # rule co-occurrences first, then popular items
+    'rules_path': '../Apriori_recommender/saves/recommendation_rules.pkl'
+}
+
 # Application settings
 DEFAULT_RECOMMENDATIONS = 5
 
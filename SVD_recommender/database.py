@@ -1,50 +1,25 @@
 """
 Database connection and data fetching utilities
 """
+import os
+import sys
+
 import pandas as pd
-import pyodbc
-from config import DB_CONFIG
 
-def create_connection_string():
-    """Create the connection string from configuration"""
-    return (f"DRIVER={DB_CONFIG['driver']};"
-            f"SERVER={DB_CONFIG['server']};"
-            f"DATABASE={DB_CONFIG['database']};"
-            f"Trusted_Connection={DB_CONFIG['trusted_connection']};")
+# The data layer is shared with the Apriori service, one level up
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from shared_data.db import get_engine, ratings_query
+from shared_data.snapshot import build_snapshot, load_snapshot, snapshot_info
+from config import DATA_SOURCE
 
 def fetch_data_from_db():
     """Fetches user-item interaction data from the database"""
-    conn_str = create_connection_string()
-    
     try:
-        conn = pyodbc.connect(conn_str)
-        
-        # SQL query to get user-item interactions
-        query = """
-        SELECT 
-            C.[TiersCode] AS user_id,
-            A.[ArtCode] AS item_id,
-            R.[Stars] AS rating
-        FROM 
-            [B2C_DB].[dbo].[Ratings] R
-        JOIN 
-            [B2C_DB].[dbo].[Clients] C ON R.[UserId] = C.[TiersId]
-        JOIN 
-            [B2C_DB].[dbo].[Articles] A ON R.[ProductId] = A.[ArtId]
-        WHERE 
-            R.[Stars] IS NOT NULL
-            AND C.[TiersCode] IS NOT NULL
-            AND A.[ArtCode] IS NOT NULL
-        ORDER BY 
-             rating DESC;
-
-        """
-      
+        engine = get_engine()
+
         # Load data into DataFrame
-        df = pd.read_sql(query, conn)
-      
-        # Close connection
-        conn.close()
+        df = pd.read_sql(ratings_query(engine), engine)
         
         # Convert to string for consistency
         df['user_id'] = df['user_id'].astype(str)
@@ -54,4 +29,47 @@ def fetch_data_from_db():
     except Exception as e:
         print(f"Database error: {e}")
         return None
-  
\ No newline at end of file
+
+def load_data_from_snapshot():
+    """User-item interactions from the latest shared snapshot, or None if there is none.
+
+    Reads the snapshot instead of querying the database. The codes are
+    decoded back to the string ids the SVD and CF models work with.
+    """
+    snapshot = load_snapshot()
+    if snapshot is None:
+        return None
+
+    return pd.DataFrame({
+        'user_id': snapshot.users[snapshot.ratings_user].astype(object),
+        'item_id': snapshot.items[snapshot.ratings_item].astype(object),
+        'rating': snapshot.ratings_value
+    })
+
+def fetch_ratings(refresh_snapshot=False):
+    """User-item interactions from the configured data source.
+
+    With the snapshot source, refresh_snapshot first builds a new snapshot
+    from the database, which the Apriori service then picks up on its next
+    full refresh too. Without it the current snapshot is reused as is.
+    """
+    if DATA_SOURCE == 'snapshot':
+        if refresh_snapshot:
+            try:
+                build_snapshot()
+            except Exception as e:
+                print(f"Snapshot build failed, keeping the current one: {e}")
+        df = load_data_from_snapshot()
+        if df is not None:
+            info = snapshot_info()
+            print(f"[SNAPSHOT] Using version {info['version']}, "
+                  f"{info['age_s']:.0f} s old, orders up to {info['watermark']}")
+            return df
+        print("No data snapshot found, fetching from the database...")
+    return fetch_data_from_db()
+
+def data_source_info():
+    """Where the ratings come from, with the snapshot's version and age when one is used"""
+    if DATA_SOURCE == 'snapshot':
+        return {'source': 'snapshot', 'snapshot': snapshot_info()}
+    return {'source': 'db'}
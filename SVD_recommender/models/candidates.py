@@ -0,0 +1,68 @@
+"""
+Candidate generation from the Apriori service's association rules, so SVD and
+CF only score a few hundred items instead of the whole catalog
+"""
+import os
+import pickle
+from config import CANDIDATE_CONFIG
+
+class CandidateGenerator:
+    def __init__(self, cooccurrence):
+        # item -> [(co-occurring item, lift)], strongest lift first
+        self.cooccurrence = cooccurrence
+
+    @classmethod
+    def from_rules(cls, rules):
+        """Collapse association rules into a per-item co-occurrence index"""
+        best_lift = {}
+        for antecedents, consequents, lift in zip(rules['antecedents'], rules['consequents'], rules['lift']):
+            for item in antecedents:
+                item_lifts = best_lift.setdefault(str(item), {})
+                for other in consequents:
+                    other = str(other)
+                    if lift > item_lifts.get(other, 0):
+                        item_lifts[other] = lift
+
+        cooccurrence = {
+            item: sorted(item_lifts.items(), key=lambda x: x[1], reverse=True)
+            for item, item_lifts in best_lift.items()
+        }
+        return cls(cooccurrence)
+
+    def generate(self, user_items, catalog, popular_items, size=None):
+        """Candidate items for a user, seeded by the items they rated.
+
+        Items co-occurring with the user's items come first, by lift, then
+        popular items fill the set up to size. Only catalog items the user
+        has not rated are returned.
+        """
+        size = size or CANDIDATE_CONFIG['size']
+
+        scores = {}
+        for item in user_items:
+            for other, lift in self.cooccurrence.get(item, []):
+                if other in catalog and other not in user_items and lift > scores.get(other, 0):
+                    scores[other] = lift
+
+        candidates = sorted(scores, key=scores.get, reverse=True)[:size]
+        selected = set(candidates)
+        for item in popular_items:
+            if len(candidates) >= size:
+                break
+            if item not in selected and item not in user_items:
+                candidates.append(item)
+                selected.add(item)
+        return candidates
+
+def load_candidate_generator():
+    """Build the generator from the Apriori rules saved on disk, if they exist"""
+    rules_path = CANDIDATE_CONFIG['rules_path']
+    if not os.path.exists(rules_path):
+        return None
+    try:
+        with open(rules_path, 'rb') as f:
+            model_data = pickle.load(f)
+        return CandidateGenerator.from_rules(model_data['rules'])
+    except Exception as e:
+        print(f"Failed to load association rules for candidate generation: {e}")
+        return None
@@ -0,0 +1,136 @@
+"""
+Precomputed item-item neighbours for item-based collaborative filtering
+"""
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from config import CF_CONFIG
+
+NEIGHBORS_PATH = "item_neighbors.npz"
+
+# Row i of indices/scores holds the top-k neighbours of items[i], best first
+ItemNeighbors = namedtuple('ItemNeighbors', ['items', 'item_index', 'indices', 'scores'])
+
+# Normalized item x user matrix, set once in every worker process
+_item_vectors = None
+
+def build_item_vectors(df):
+    """L2-normalized sparse item x user rating matrix and the item ids of its rows"""
+    ratings = df.groupby(['item_id', 'user_id'])['rating'].mean().reset_index()
+    item_codes, items = pd.factorize(ratings['item_id'])
+    user_codes, users = pd.factorize(ratings['user_id'])
+
+    matrix = sp.csr_matrix(
+        (ratings['rating'].to_numpy(dtype=np.float32), (item_codes, user_codes)),
+        shape=(len(items), len(users))
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sp.diags(1.0 / norms).dot(matrix).astype(np.float32).tocsr(), list(items)
+
+def _init_worker(item_vectors):
+    global _item_vectors
+    _item_vectors = item_vectors
+
+def _top_k_block(args):
+    """Top-k cosine neighbours for the items of rows [start, end)"""
+    start, end, k = args
+    similarities = _item_vectors[start:end].dot(_item_vectors.T).toarray()
+
+    # An item is not its own neighbour
+    rows = np.arange(end - start)
+    similarities[rows, rows + start] = 0
+
+    if k < similarities.shape[1]:
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    else:
+        top = np.tile(np.arange(similarities.shape[1]), (end - start, 1))
+    top_scores = np.take_along_axis(similarities, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+
+    return (start,
+            np.take_along_axis(top, order, axis=1).astype(np.int32),
+            np.take_along_axis(top_scores, order, axis=1).astype(np.float32))
+
+def build_item_neighbors(df, k=None, block_size=None, n_jobs=None):
+    """Compute the top-k item-item cosine neighbours, one block of items per task.
+
+    Only a block_size x n_items slice of the similarity matrix exists at a time
+    in each worker, never the full item x item matrix.
+    """
+    k = k or CF_CONFIG['item_neighbors']
+    block_size = block_size or CF_CONFIG['block_size']
+    n_jobs = n_jobs or CF_CONFIG['n_jobs']
+
+    item_vectors, items = build_item_vectors(df)
+    n_items = len(items)
+    k = max(1, min(k, n_items - 1))
+
+    indices = np.zeros((n_items, k), dtype=np.int32)
+    scores = np.zeros((n_items, k), dtype=np.float32)
+    blocks = [(start, min(start + block_size, n_items), k) for start in range(0, n_items, block_size)]
+
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                             initargs=(item_vectors,)) as executor:
+        for start, block_indices, block_scores in executor.map(_top_k_block, blocks):
+            indices[start:start + len(block_indices)] = block_indices
+            scores[start:start + len(block_scores)] = block_scores
+
+    return ItemNeighbors(items, {item: i for i, item in enumerate(items)}, indices, scores)
+
+def save_item_neighbors(neighbors):
+    """Persist the neighbour table as compact arrays"""
+    np.savez(NEIGHBORS_PATH,
+             items=np.array(neighbors.items, dtype=str),
+             indices=neighbors.indices,
+             scores=neighbors.scores)
+
+def load_item_neighbors():
+    """Load the neighbour table from disk if it exists"""
+    if os.path.exists(NEIGHBORS_PATH):
+        with np.load(NEIGHBORS_PATH, allow_pickle=False) as data:
+            items = data['items'].tolist()
+            return ItemNeighbors(items, {item: i for i, item in enumerate(items)},
+                                 data['indices'], data['scores'])
+    return None
+
+def get_item_neighbor_scores(neighbors, user_ratings, shrinkage=None):
+    """Score items by the neighbour lists of the user's rated items.
+
+    user_ratings maps item_id -> rating. Each item's similarity-weighted
+    rating sum is divided by its similarity mass plus shrinkage: a plain
+    weighted average would give any neighbour of a 5-star item about 5,
+    however weak the link. Scores are then rescaled so the best one equals
+    the user's top rating, keeping them on the scale of the SVD blend.
+    """
+    shrinkage = CF_CONFIG['item_shrinkage'] if shrinkage is None else shrinkage
+    rated = [(neighbors.item_index[item], rating)
+             for item, rating in user_ratings.items() if item in neighbors.item_index]
+    if not rated:
+        return {}
+
+    codes = np.array([code for code, _ in rated])
+    ratings = np.array([rating for _, rating in rated], dtype=np.float32)
+
+    neighbor_codes = neighbors.indices[codes].ravel()
+    similarities = neighbors.scores[codes]
+    n_items = len(neighbors.items)
+
+    weighted_sum = np.bincount(neighbor_codes, weights=(similarities * ratings[:, None]).ravel(),
+                               minlength=n_items)
+    similarity_sum = np.bincount(neighbor_codes, weights=similarities.ravel(), minlength=n_items)
+
+    # Rated items are not recommended back
+    similarity_sum[codes] = 0
+    scored = np.nonzero(similarity_sum > 0)[0]
+    if not len(scored):
+        return {}
+
+    scores = weighted_sum[scored] / (similarity_sum[scored] + shrinkage)
+    if scores.max() > 0:
+        scores *= ratings.max() / scores.max()
+    return {neighbors.items[i]: float(score) for i, score in zip(scored, scores)}
@@ -1,30 +1,69 @@
 import os
 import pickle
-from surprise import Dataset, Reader, SVD
+from collections import defaultdict
+from surprise import Dataset, Reader, SVD, accuracy
 from surprise.model_selection import train_test_split
-from config import MODEL_CONFIG
+from config import MODEL_CONFIG, TUNING_CONFIG
 
 MODEL_PATH = "svd_model.pkl"
 
-def create_svd_model(df, save_to_disk=True):
-    """Create and train an SVD model using the provided DataFrame"""
+def split_ratings(df):
+    """Train/held-out split of the ratings, the same for training and tuning"""
     reader = Reader(rating_scale=(0, df['rating'].max()))
     data = Dataset.load_from_df(df[['user_id', 'item_id', 'rating']], reader)
     
-    trainset, _ = train_test_split(
+    return train_test_split(
         data,
         test_size=0.2,
         random_state=MODEL_CONFIG['random_state']
     )
 
+def train_svd(trainset, params=None):
+    """Train an SVD model, with MODEL_CONFIG overridden by params"""
+    params = {**MODEL_CONFIG, **(params or {})}
     svd = SVD(
-        n_factors=MODEL_CONFIG['n_factors'],
-        n_epochs=MODEL_CONFIG['n_epochs'],
-        lr_all=MODEL_CONFIG['lr_all'],
-        reg_all=MODEL_CONFIG['reg_all'],
-        random_state=MODEL_CONFIG['random_state']
+        n_factors=params['n_factors'],
+        n_epochs=params['n_epochs'],
+        lr_all=params['lr_all'],
+        reg_all=params['reg_all'],
+        random_state=params['random_state']
     )
     svd.fit(trainset)
+    return svd
+
+def precision_at_k(predictions, k, threshold):
+    """Mean over users of the share of their top-k predictions that are relevant"""
+    user_est_true = defaultdict(list)
+    for uid, _, true_r, est, _ in predictions:
+        user_est_true[uid].append((est, true_r))
+
+    precisions = []
+    for ratings in user_est_true.values():
+        ratings.sort(key=lambda x: x[0], reverse=True)
+        top_k = ratings[:k]
+        n_rec = sum(est >= threshold for est, _ in top_k)
+        n_rel_and_rec = sum(est >= threshold and true_r >= threshold for est, true_r in top_k)
+        precisions.append(n_rel_and_rec / n_rec if n_rec else 0)
+    return sum(precisions) / len(precisions) if precisions else 0.0
+
+def evaluate_svd_model(model, testset):
+    """Held-out RMSE and precision@k of a trained model"""
+    predictions = model.test(testset)
+    return {
+        'rmse': accuracy.rmse(predictions, verbose=False),
+        'precision_at_k': precision_at_k(
+            predictions, TUNING_CONFIG['precision_k'], TUNING_CONFIG['relevance_threshold']
+        )
+    }
+
+def create_svd_model(df, save_to_disk=True, params=None):
+    """Create and train an SVD model using the provided DataFrame"""
+    trainset, testset = split_ratings(df)
+    svd = train_svd(trainset, params)
+
+    metrics = evaluate_svd_model(svd, testset)
+    print(f"[SVD] Held-out RMSE {metrics['rmse']:.4f}, "
+          f"precision@{TUNING_CONFIG['precision_k']} {metrics['precision_at_k']:.4f}")
 
     if save_to_disk:
         with open(MODEL_PATH, 'wb') as f:
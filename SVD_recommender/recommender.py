@@ -5,22 +5,48 @@ from collections import defaultdict
 from models.similarity import get_similar_users
 from models.svd_model import get_svd_predictions
 from models.similarity import get_neighborhood_scores
+from models.item_neighbors import get_item_neighbor_scores
+from config import CF_CONFIG, CANDIDATE_CONFIG
+
+CF_MODES = ('user', 'item')
 
 class RecommenderService:
-    def __init__(self, df, svd_model):
-        self.df = df
+    def __init__(self, df, svd_model, item_neighbors=None, candidate_generator=None):
         self.svd_model = svd_model
+        self.item_neighbors = item_neighbors
+        self.candidate_generator = candidate_generator
+        self.set_data(df)
+
+    def set_data(self, df):
+        """Swap in new ratings and rebuild everything derived from them"""
+        self.df = df
         self.user_item_matrix = df.pivot_table(index='user_id', columns='item_id', values='rating', fill_value=0)
 
-    def get_popular_items(self, n=10):
-        stats = self.df.groupby('item_id').agg(
+        # Per-user ratings (mean over duplicates, as in the matrix), the
+        # catalog and the popularity ranking, built once so requests never
+        # scan the whole df
+        mean_ratings = df.groupby(['user_id', 'item_id'])['rating'].mean()
+        self.user_ratings = {
+            user_id: ratings.droplevel('user_id').to_dict()
+            for user_id, ratings in mean_ratings.groupby(level='user_id')
+        }
+        self.catalog = set(df['item_id'].unique())
+        self.popular_items = self.rank_popular_items(df)
+
+    @staticmethod
+    def rank_popular_items(df):
+        """All items as (item_id, popularity), most popular first"""
+        stats = df.groupby('item_id').agg(
             count=('rating', 'count'),
             avg_rating=('rating', 'mean')
         ).reset_index()
         stats['norm_count'] = stats['count'] / stats['count'].max()
         stats['popularity'] = 0.7 * stats['norm_count'] + 0.3 * (stats['avg_rating'] / 5.0)
-        top_items = stats.sort_values('popularity', ascending=False).head(n)
-        return list(zip(top_items['item_id'], top_items['popularity']))
+        ranked = stats.sort_values('popularity', ascending=False)
+        return list(zip(ranked['item_id'], ranked['popularity']))
+
+    def get_popular_items(self, n=10):
+        return self.popular_items[:n]
 
     def get_diverse_recommendations(self, n=5):
         popular_items = self.get_popular_items(n * 3)
@@ -54,18 +80,48 @@ class RecommenderService:
         scores = get_neighborhood_scores(item_quantities)
         return sorted(scores.items(), key=lambda x: x[1], reverse=True)
 
-    def get_recommendations(self, user_id, n=5):
+    def get_item_cf_predictions(self, user_id, unpurchased_items):
+        """Get CF predictions from the precomputed item-item neighbour table"""
+        scores = get_item_neighbor_scores(self.item_neighbors, self.user_ratings.get(user_id, {}))
+        unpurchased = set(unpurchased_items)
+        return sorted(((item, score) for item, score in scores.items() if item in unpurchased),
+                      key=lambda x: x[1], reverse=True)
+
+    def get_candidates(self, user_items, all_items, size=None):
+        """Items to score for a user: rule co-occurrences of their items, then popular items"""
+        size = size or CANDIDATE_CONFIG['size']
+        popular = [item for item, _ in self.get_popular_items(size + len(user_items))]
+        return self.candidate_generator.generate(user_items, all_items, popular, size)
+
+    def resolve_cf_mode(self, cf_mode=None):
+        """CF mode for a request: explicit choice, else config; item mode needs the neighbour table"""
+        cf_mode = cf_mode or CF_CONFIG['mode']
+        if cf_mode == 'item' and self.item_neighbors is None:
+            return 'user'
+        return cf_mode
+
+    def get_recommendations(self, user_id, n=5, cf_mode=None, use_candidates=None):
         if user_id not in self.user_item_matrix.index:
             return self.get_diverse_recommendations(n)
 
-        all_items = set(self.df['item_id'].unique())
-        user_items = set(self.df[self.df['user_id'] == user_id]['item_id'].unique())
-        unpurchased = list(all_items - user_items)
+        all_items = self.catalog
+        user_items = set(self.user_ratings.get(user_id, {}))
+
+        if use_candidates is None:
+            use_candidates = CANDIDATE_CONFIG['enabled']
+        if use_candidates and self.candidate_generator is not None:
+            # Two-stage: only score the candidates, not the whole catalog
+            unpurchased = self.get_candidates(user_items, all_items)
+        else:
+            unpurchased = list(all_items - user_items)
 
         try:
-            similar_users = get_similar_users(user_id, self.user_item_matrix, n=10)
             svd_preds = get_svd_predictions(self.svd_model, user_id, unpurchased)
-            cf_preds = self.get_cf_predictions(user_id, unpurchased, similar_users)
+            if self.resolve_cf_mode(cf_mode) == 'item':
+                cf_preds = self.get_item_cf_predictions(user_id, unpurchased)
+            else:
+                similar_users = get_similar_users(user_id, self.user_item_matrix, n=10)
+                cf_preds = self.get_cf_predictions(user_id, unpurchased, similar_users)
 
             if not cf_preds and not svd_preds:  # If both prediction methods fail
                 return self.get_diverse_recommendations(n)
@@ -98,10 +154,10 @@ class RecommenderService:
             print(f"Recommendation error for user {user_id}: {e}")
             return self.get_diverse_recommendations(n)
 
-    def get_top_products(self, user_id, n=5):
+    def get_top_products(self, user_id, n=5, cf_mode=None):
         try:
             user_exists = user_id in self.user_item_matrix.index
-            recs = self.get_recommendations(user_id, n)
+            recs = self.get_recommendations(user_id, n, cf_mode)
             products = []
             for i, (item, score) in enumerate(recs, 1):
                 prod = {'rank': i, 'item_id': item, 'score': round(score, 2)}
@@ -112,6 +168,7 @@ class RecommenderService:
                 'user_id': user_id,
                 'user_exists': user_exists,
                 'recommendation_type': 'personalized' if user_exists else 'popular',
+                'cf_mode': self.resolve_cf_mode(cf_mode),
                 'recommendations': products
             }
         except Exception as e:
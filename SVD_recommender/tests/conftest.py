@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The service modules import each other as top-level modules. Both services
+# have a top-level config module, so drop the other service's if it was
+# loaded first
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.modules.pop('config', None)
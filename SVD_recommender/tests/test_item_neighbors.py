@@ -0,0 +1,79 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+pytest.importorskip('scipy')
+sklearn_pairwise = pytest.importorskip('sklearn.metrics.pairwise')
+
+from models.item_neighbors import (ItemNeighbors, build_item_vectors, build_item_neighbors,
+                                   get_item_neighbor_scores)
+
+
+def random_ratings(n_users=60, n_items=40, n_ratings=600, seed=7):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'user_id': [f"CLI{u}" for u in rng.integers(0, n_users, n_ratings)],
+        'item_id': [f"ART{i}" for i in rng.integers(0, n_items, n_ratings)],
+        'rating': rng.integers(1, 6, n_ratings).astype(float)
+    })
+
+
+def test_neighbor_table_matches_brute_force_cosine():
+    df = random_ratings()
+    k = 5
+    # Small blocks so the table is assembled from several tasks
+    neighbors = build_item_neighbors(df, k=k, block_size=7, n_jobs=2)
+
+    item_vectors, items = build_item_vectors(df)
+    assert neighbors.items == items
+    similarities = sklearn_pairwise.cosine_similarity(item_vectors.toarray())
+    np.fill_diagonal(similarities, 0)
+
+    for i in range(len(items)):
+        expected = np.sort(similarities[i])[::-1][:k]
+        np.testing.assert_allclose(neighbors.scores[i], expected, rtol=1e-5, atol=1e-6)
+        # Neighbours are listed best first and carry their own similarity
+        np.testing.assert_allclose(similarities[i, neighbors.indices[i]], neighbors.scores[i],
+                                   rtol=1e-5, atol=1e-6)
+        # An item is never its own neighbour, unless nothing better is left
+        assert all(score == 0 for j, score in zip(neighbors.indices[i], neighbors.scores[i]) if j == i)
+
+
+def make_neighbors(table):
+    """Neighbour table from {item: [(neighbour, similarity), ...]}, best first"""
+    items = sorted(set(table) | {n for row in table.values() for n, _ in row})
+    item_index = {item: i for i, item in enumerate(items)}
+    k = max(len(row) for row in table.values())
+    indices = np.zeros((len(items), k), dtype=np.int32)
+    scores = np.zeros((len(items), k), dtype=np.float32)
+    for item, row in table.items():
+        for j, (other, similarity) in enumerate(row):
+            indices[item_index[item], j] = item_index[other]
+            scores[item_index[item], j] = similarity
+    return ItemNeighbors(items, item_index, indices, scores)
+
+
+def test_weak_links_do_not_outrank_similarity_mass():
+    # WEAK is only loosely tied to the 5-star item; STRONG is closely tied
+    # to both rated items
+    neighbors = make_neighbors({
+        'ART5': [('STRONG', 0.35), ('WEAK', 0.15)],
+        'ART3': [('STRONG', 0.36)],
+    })
+    user_ratings = {'ART5': 5.0, 'ART3': 3.0}
+
+    scores = get_item_neighbor_scores(neighbors, user_ratings, shrinkage=1.0)
+    assert set(scores) == {'STRONG', 'WEAK'}
+    assert scores['STRONG'] > scores['WEAK']
+    # Rescaled so the best match sits at the user's top rating
+    assert scores['STRONG'] == pytest.approx(5.0)
+
+    # Without shrinkage it is the plain weighted average, where the weak
+    # link to the 5-star item wins
+    averages = get_item_neighbor_scores(neighbors, user_ratings, shrinkage=0.0)
+    assert averages['WEAK'] > averages['STRONG']
+
+
+def test_unknown_items_score_nothing():
+    neighbors = make_neighbors({'ART1': [('ART2', 0.5)]})
+    assert get_item_neighbor_scores(neighbors, {'ART9': 4.0}) == {}
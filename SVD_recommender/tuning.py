@@ -0,0 +1,197 @@
+"""
+Hyperparameter search and training-pipeline profiling for the SVD model
+
+Evaluates a grid (or a random sample of it) of MODEL_CONFIG candidates in a
+process pool, with early stopping over epochs on held-out RMSE and precision@k,
+and records stage timings, model size and serving latency for each candidate.
+
+Usage: python tuning.py [--random N] [--workers N]
+"""
+import argparse
+import itertools
+import json
+import os
+import pickle
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from database import fetch_ratings
+from models.svd_model import split_ratings, train_svd, evaluate_svd_model, get_svd_predictions
+from models.item_neighbors import build_item_neighbors
+from recommender import RecommenderService
+from config import MODEL_CONFIG, TUNING_CONFIG
+
+# Data shared by the candidates, set once in every worker process
+_trainset = None
+_testset = None
+_model_dir = None
+
+def _init_worker(df, model_dir):
+    global _trainset, _testset, _model_dir
+    _trainset, _testset = split_ratings(df)
+    _model_dir = model_dir
+
+def candidate_grid(n_random=None, seed=None):
+    """All combinations of the tuning grid, or a random sample of n_random of them"""
+    grid = TUNING_CONFIG['grid']
+    names = list(grid)
+    candidates = [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+    if n_random is not None and n_random < len(candidates):
+        candidates = random.Random(seed or MODEL_CONFIG['random_state']).sample(candidates, n_random)
+    return candidates
+
+def evaluate_candidate(params):
+    """Train one candidate with early stopping over epochs and profile the result"""
+    history = []
+    best, best_model, best_time, stale = None, None, None, 0
+    search_time = 0.0
+
+    # With a fixed random_state, training n epochs from scratch follows exactly
+    # the first n epochs of a longer run, so each checkpoint is a fresh fit
+    for n_epochs in range(TUNING_CONFIG['epoch_step'], TUNING_CONFIG['max_epochs'] + 1,
+                          TUNING_CONFIG['epoch_step']):
+        start_time = time.time()
+        model = train_svd(_trainset, {**params, 'n_epochs': n_epochs})
+        fit_time = time.time() - start_time
+        search_time += fit_time
+
+        metrics = evaluate_svd_model(model, _testset)
+        history.append({'n_epochs': n_epochs, **metrics})
+
+        improved = best is None or metrics['rmse'] < best['rmse'] \
+            or metrics['precision_at_k'] > best['precision_at_k']
+        if best is None or metrics['rmse'] < best['rmse']:
+            best, best_model, best_time = history[-1], model, fit_time
+        if improved:
+            stale = 0
+        else:
+            stale += 1
+            if stale >= TUNING_CONFIG['patience']:
+                break
+
+    start_time = time.time()
+    serialized = pickle.dumps(best_model)
+    serialization_time = time.time() - start_time
+
+    # Serving latency is measured later, by the parent once the pool is idle
+    model_path = os.path.join(_model_dir, f"{uuid.uuid4().hex}.pkl")
+    with open(model_path, 'wb') as f:
+        f.write(serialized)
+
+    return {
+        'params': {**params, 'n_epochs': best['n_epochs']},
+        'rmse': best['rmse'],
+        'precision_at_k': best['precision_at_k'],
+        'history': history,
+        # Cost of retraining with the chosen epochs, and of finding them
+        'training_s': round(best_time, 3),
+        'search_training_s': round(search_time, 3),
+        'serialization_s': round(serialization_time, 3),
+        'model_size_mb': round(len(serialized) / (1024 * 1024), 3),
+        'model_path': model_path
+    }
+
+def measure_serving_latency(model, users, catalog, repeats=None):
+    """Median over repeats of the mean ms to score the whole catalog for a user"""
+    repeats = repeats or TUNING_CONFIG['latency_repeats']
+    means = []
+    for _ in range(repeats):
+        start_time = time.time()
+        for user_id in users:
+            get_svd_predictions(model, user_id, catalog)
+        means.append((time.time() - start_time) * 1000 / max(len(users), 1))
+    return statistics.median(means)
+
+def choose_configuration(results):
+    """Cheapest candidate to serve whose RMSE is within rmse_tolerance of the best"""
+    best_rmse = min(r['rmse'] for r in results)
+    acceptable = [r for r in results if r['rmse'] <= best_rmse * (1 + TUNING_CONFIG['rmse_tolerance'])]
+    return min(acceptable, key=lambda r: (r['serving_latency_ms'], r['model_size_mb']))
+
+def run_tuning(n_random=None, n_workers=None):
+    """Profile the training pipeline and search the grid; returns the report"""
+    n_workers = n_workers or TUNING_CONFIG['n_workers']
+    stages = {}
+
+    start_time = time.time()
+    df = fetch_ratings()
+    stages['data_fetch_s'] = round(time.time() - start_time, 3)
+
+    start_time = time.time()
+    RecommenderService(df, None)
+    stages['user_item_matrix_s'] = round(time.time() - start_time, 3)
+
+    start_time = time.time()
+    build_item_neighbors(df)
+    stages['item_neighbors_s'] = round(time.time() - start_time, 3)
+
+    users = sorted(df['user_id'].unique())
+    latency_users = random.Random(MODEL_CONFIG['random_state']).sample(
+        users, min(TUNING_CONFIG['latency_users'], len(users)))
+
+    candidates = candidate_grid(n_random)
+    print(f"[TUNING] Evaluating {len(candidates)} candidates...")
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        start_time = time.time()
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                 initargs=(df, model_dir)) as executor:
+            results = list(executor.map(evaluate_candidate, candidates))
+        stages['search_s'] = round(time.time() - start_time, 3)
+
+        # One candidate at a time in this process, with the workers gone: timed
+        # next to other candidates training on every CPU, latency differences
+        # between configurations would be lost in the contention
+        start_time = time.time()
+        catalog = list(df['item_id'].unique())
+        for result in results:
+            with open(result.pop('model_path'), 'rb') as f:
+                model = pickle.load(f)
+            result['serving_latency_ms'] = round(measure_serving_latency(model, latency_users, catalog), 2)
+            del model
+        stages['serving_latency_s'] = round(time.time() - start_time, 3)
+
+    results.sort(key=lambda r: r['rmse'])
+    current = {k: MODEL_CONFIG[k] for k in ('n_factors', 'n_epochs', 'lr_all', 'reg_all')}
+    return {
+        'stages': stages,
+        'notes': {
+            'training_s': "one fit at the chosen n_epochs",
+            'search_training_s': "all early-stopping checkpoint fits of the candidate, "
+                                 "each trained from scratch"
+        },
+        'current': current,
+        'recommended': choose_configuration(results),
+        'results': results
+    }
+
+def print_report(report):
+    print("[TUNING] Pipeline stages: " + ", ".join(f"{k}={v}" for k, v in report['stages'].items()))
+    print(f"{'n_factors':>9} {'epochs':>6} {'lr_all':>7} {'reg_all':>7} {'rmse':>7} "
+          f"{'prec@k':>7} {'train_s':>8} {'search_s':>9} {'size_mb':>8} {'serve_ms':>9}")
+    for r in report['results']:
+        p = r['params']
+        print(f"{p['n_factors']:>9} {p['n_epochs']:>6} {p['lr_all']:>7} {p['reg_all']:>7} "
+              f"{r['rmse']:>7.4f} {r['precision_at_k']:>7.4f} {r['training_s']:>8.2f} "
+              f"{r['search_training_s']:>9.2f} {r['model_size_mb']:>8.2f} {r['serving_latency_ms']:>9.2f}")
+    print("[TUNING] train_s is one fit at the chosen epochs; search_s sums every "
+          "early-stopping checkpoint fit of the candidate")
+    print(f"[TUNING] Current MODEL_CONFIG: {report['current']}")
+    print(f"[TUNING] Recommended: {report['recommended']['params']}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--random', type=int, default=None, help="evaluate N random grid points")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes")
+    args = parser.parse_args()
+
+    report = run_tuning(args.random, args.workers)
+    print_report(report)
+
+    with open(TUNING_CONFIG['report_path'], 'w') as f:
+        json.dump(report, f, indent=2, default=float)
+    print(f"[TUNING] Report saved to {TUNING_CONFIG['report_path']}")
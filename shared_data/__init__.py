@@ -0,0 +1,5 @@
+"""
+Data layer shared by the SVD and Apriori recommendation services: one database
+connection setup, and versioned on-disk snapshots of ratings and order lines
+with a single integer item vocabulary
+"""
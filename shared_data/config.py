@@ -0,0 +1,31 @@
+"""
+Configuration settings shared by both recommendation services
+"""
+import os
+
+# Database settings
+DB_CONFIG = {
+    'driver': '{SQL Server}',
+    'server': 'DESKTOP-QD57IO2\\SQLEXPRESS',
+    'database': 'B2C_DB',
+    'trusted_connection': 'yes'
+}
+
+# Engine settings
+ENGINE_CONFIG = {
+    'url': None,  # SQLAlchemy URL overriding DB_CONFIG, e.g. 'sqlite:///b2c.db'
+    'pool_size': 5,
+    'chunksize': 50000
+}
+
+# DocumentVentes column that only grows as new orders come in. Several orders
+# may share a value (DocDate has no time part), so the orders seen at the last
+# value are remembered and skipped on the next run; a strictly increasing
+# column such as an identity or created-at timestamp avoids re-reading them
+WATERMARK_COLUMN = 'DocDate'
+
+# Snapshot settings
+SNAPSHOT_CONFIG = {
+    'root': os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'snapshots'),
+    'keep': 3  # versions kept on disk, older ones are deleted
+}
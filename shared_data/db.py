@@ -0,0 +1,196 @@
+"""
+Database connection and streaming readers for ratings and order lines
+"""
+import numpy as np
+import pandas as pd
+import sqlalchemy
+
+from .config import DB_CONFIG, ENGINE_CONFIG, WATERMARK_COLUMN
+
+_engine = None
+
+def create_connection_string():
+    """Create the connection string from configuration"""
+    return (f"DRIVER={DB_CONFIG['driver']};"
+            f"SERVER={DB_CONFIG['server']};"
+            f"DATABASE={DB_CONFIG['database']};"
+            f"Trusted_Connection={DB_CONFIG['trusted_connection']};")
+
+def get_engine():
+    """Shared engine, created once so its connection pool is reused across fetches"""
+    global _engine
+    if _engine is None:
+        if ENGINE_CONFIG['url']:
+            connection_url = ENGINE_CONFIG['url']
+        else:
+            conn_str = create_connection_string()
+            connection_url = f"mssql+pyodbc:///?odbc_connect={conn_str}"
+
+        options = {'pool_pre_ping': True}
+        if not connection_url.startswith('sqlite'):
+            options['pool_size'] = ENGINE_CONFIG['pool_size']
+        _engine = sqlalchemy.create_engine(connection_url, **options)
+    return _engine
+
+def table_name(engine, name):
+    # SQLite stand-ins have no database/schema qualifiers
+    if engine.dialect.name == 'sqlite':
+        return f"[{name}]"
+    return f"[{DB_CONFIG['database']}].[dbo].[{name}]"
+
+class Vocabulary:
+    """Incremental mapping of string ids to consecutive integer codes"""
+
+    def __init__(self):
+        self.index = {}
+        self.values = []
+
+    @classmethod
+    def from_values(cls, values):
+        """Vocabulary continuing an existing one, e.g. a snapshot's item array"""
+        vocabulary = cls()
+        vocabulary.values = [str(value) for value in values]
+        vocabulary.index = {value: code for code, value in enumerate(vocabulary.values)}
+        return vocabulary
+
+    def __len__(self):
+        return len(self.values)
+
+    def encode(self, values):
+        """Codes for a batch of ids, adding the ids not seen so far"""
+        local_codes, uniques = pd.factorize(values)
+        codes = np.empty(len(uniques), dtype=np.int32)
+        for i, value in enumerate(uniques):
+            value = str(value)
+            code = self.index.get(value)
+            if code is None:
+                code = len(self.values)
+                self.index[value] = code
+                self.values.append(value)
+            codes[i] = code
+        return codes[local_codes]
+
+def ratings_query(engine):
+    """User-item interactions: who rated which article, and how"""
+    return sqlalchemy.text(f"""
+    SELECT
+        C.[TiersCode] AS user_id,
+        A.[ArtCode] AS item_id,
+        R.[Stars] AS rating
+    FROM
+        {table_name(engine, 'Ratings')} R
+    JOIN
+        {table_name(engine, 'Clients')} C ON R.[UserId] = C.[TiersId]
+    JOIN
+        {table_name(engine, 'Articles')} A ON R.[ProductId] = A.[ArtId]
+    WHERE
+        R.[Stars] IS NOT NULL
+        AND C.[TiersCode] IS NOT NULL
+        AND A.[ArtCode] IS NOT NULL
+    ORDER BY
+         rating DESC
+    """)
+
+def order_lines_query(engine, since=None, until=None):
+    """Order lines, optionally only for orders in the [since, until] watermark range.
+
+    The range includes since: orders saved later with the same watermark
+    value as the last run would otherwise be skipped, so callers drop the
+    orders they already have at that value (see stream_order_lines).
+
+    Orders without a watermark value are kept when there is no lower bound,
+    i.e. on full fetches. Incremental fetches cannot place them, so they are
+    only picked up by the next full refresh.
+    """
+    query = f"""
+    SELECT
+        DV.[DocPiece] AS order_id,
+        DVL.[LigneArtCode] AS item_id,
+        DV.[{WATERMARK_COLUMN}] AS watermark
+    FROM
+        {table_name(engine, 'DocumentVentes')} DV
+    JOIN
+        {table_name(engine, 'DocumentVenteLignes')} DVL
+        ON DV.[DocPiece] = DVL.[LigneDocPiece]
+    WHERE 1 = 1
+    """
+    params = {}
+    if since is not None:
+        query += f" AND DV.[{WATERMARK_COLUMN}] >= :since"
+        params['since'] = since
+    if until is not None:
+        if since is None:
+            query += f" AND (DV.[{WATERMARK_COLUMN}] <= :until OR DV.[{WATERMARK_COLUMN}] IS NULL)"
+        else:
+            query += f" AND DV.[{WATERMARK_COLUMN}] <= :until"
+        params['until'] = until
+    return sqlalchemy.text(query), params
+
+def fetch_watermark():
+    """Latest value of the watermark column, i.e. how far the orders go"""
+    engine = get_engine()
+    query = f"""
+    SELECT MAX(DV.[{WATERMARK_COLUMN}]) FROM {table_name(engine, 'DocumentVentes')} DV
+    """
+
+    with engine.connect() as conn:
+        return conn.execute(sqlalchemy.text(query)).scalar()
+
+def _stream(query, params, chunksize, required=None):
+    engine = get_engine()
+    with engine.connect().execution_options(stream_results=True) as conn:
+        for chunk in pd.read_sql(query, conn, params=params,
+                                 chunksize=chunksize or ENGINE_CONFIG['chunksize']):
+            # Rows without an id carry nothing for either engine
+            yield chunk.dropna(subset=required)
+
+def _concat(chunks, dtype):
+    return np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype)
+
+def stream_order_lines(since=None, until=None, chunksize=None, items=None, exclude_orders=None):
+    """Stream order lines chunk by chunk, encoding ids as integer codes on the fly.
+
+    Only the code arrays are kept, so memory stays close to one chunk of
+    strings plus two int32 columns. Pass an existing item vocabulary to share
+    item codes with other data, and the boundary orders of the previous run
+    as exclude_orders when continuing from its watermark.
+
+    Returns (order_codes, item_codes, orders, items, boundary), where boundary
+    is the set of order ids whose watermark value equals until.
+    """
+    query, params = order_lines_query(get_engine(), since, until)
+    orders = Vocabulary()
+    items = items if items is not None else Vocabulary()
+    exclude_orders = exclude_orders or set()
+    boundary = set()
+    order_chunks, item_chunks = [], []
+
+    for chunk in _stream(query, params, chunksize, required=['order_id', 'item_id']):
+        order_ids = chunk['order_id'].astype(str)
+        if exclude_orders:
+            kept = ~order_ids.isin(exclude_orders)
+            chunk, order_ids = chunk[kept], order_ids[kept]
+        if until is not None:
+            boundary.update(order_ids[chunk['watermark'] == until])
+        order_chunks.append(orders.encode(order_ids))
+        item_chunks.append(items.encode(chunk['item_id']))
+
+    return _concat(order_chunks, np.int32), _concat(item_chunks, np.int32), orders, items, boundary
+
+def stream_ratings(chunksize=None, users=None, items=None):
+    """Stream ratings as integer user and item codes.
+
+    Returns (user_codes, item_codes, ratings, users, items), rows in query order.
+    """
+    query = ratings_query(get_engine())
+    users = users if users is not None else Vocabulary()
+    items = items if items is not None else Vocabulary()
+    user_chunks, item_chunks, rating_chunks = [], [], []
+
+    for chunk in _stream(query, {}, chunksize):
+        user_chunks.append(users.encode(chunk['user_id']))
+        item_chunks.append(items.encode(chunk['item_id']))
+        rating_chunks.append(chunk['rating'].to_numpy(dtype=np.float32))
+
+    return (_concat(user_chunks, np.int32), _concat(item_chunks, np.int32),
+            _concat(rating_chunks, np.float32), users, items)
@@ -0,0 +1,171 @@
+"""
+Versioned on-disk snapshots of ratings and order lines.
+
+A snapshot is a directory of NumPy arrays: integer codes for every id, with a
+single item vocabulary shared by ratings and order lines. The arrays load
+memory-mapped. The Apriori service builds its basket straight from the order
+line codes; the SVD service decodes the rating codes back to string ids. The
+CURRENT file names the latest complete snapshot.
+
+Usage (from the repository root): python -m shared_data.snapshot
+"""
+import json
+import os
+import shutil
+import time
+from collections import namedtuple
+from datetime import date, datetime
+
+import numpy as np
+
+from .config import SNAPSHOT_CONFIG
+from .db import Vocabulary, fetch_watermark, stream_order_lines, stream_ratings
+
+ARRAYS = [
+    'items',  # item vocabulary, shared by ratings and order lines
+    'users',
+    'ratings_user',
+    'ratings_item',
+    'ratings_value',
+    'order_lines_order',
+    'order_lines_item'
+]
+
+Snapshot = namedtuple('Snapshot', ['version', 'path', 'watermark', 'boundary_orders', 'n_orders'] + ARRAYS)
+
+def _current_path(root):
+    return os.path.join(root, 'CURRENT')
+
+def _encode_watermark(watermark):
+    if isinstance(watermark, datetime):
+        return {'type': 'datetime', 'value': watermark.isoformat()}
+    if isinstance(watermark, date):
+        return {'type': 'date', 'value': watermark.isoformat()}
+    return {'type': 'raw', 'value': watermark}
+
+def _decode_watermark(watermark):
+    if watermark['type'] == 'datetime':
+        return datetime.fromisoformat(watermark['value'])
+    if watermark['type'] == 'date':
+        return date.fromisoformat(watermark['value'])
+    return watermark['value']
+
+def build_snapshot(root=None):
+    """Fetch ratings and order lines once and write them as a new snapshot version"""
+    root = root or SNAPSHOT_CONFIG['root']
+    print("[SNAPSHOT] Building data snapshot...")
+    start_time = time.time()
+
+    items = Vocabulary()
+    ratings_user, ratings_item, ratings_value, users, items = stream_ratings(items=items)
+
+    # Orders are taken up to the watermark, so the Apriori service can
+    # continue incrementally from the snapshot
+    watermark = fetch_watermark()
+    order_lines_order, order_lines_item, orders, items, boundary = stream_order_lines(
+        until=watermark, items=items)
+
+    arrays = {
+        'items': np.array(items.values, dtype=str),
+        'users': np.array(users.values, dtype=str),
+        'ratings_user': ratings_user,
+        'ratings_item': ratings_item,
+        'ratings_value': ratings_value,
+        'order_lines_order': order_lines_order,
+        'order_lines_item': order_lines_item
+    }
+
+    # Microseconds keep versions unique (and sorted) across quick rebuilds
+    version = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    path = os.path.join(root, version)
+    tmp_path = path + '.tmp'
+    manifest = {
+        'version': version,
+        'created_at': datetime.now().isoformat(),
+        'watermark': _encode_watermark(watermark),
+        'boundary_orders': sorted(boundary),
+        'n_items': len(items),
+        'n_users': len(users),
+        'n_orders': len(orders),
+        'n_ratings': len(ratings_value),
+        'n_order_lines': len(order_lines_item)
+    }
+
+    os.makedirs(tmp_path)
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), array)
+        with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2, default=str)
+
+        # Publish: the directory rename and the CURRENT swap are both atomic,
+        # so readers only ever see complete snapshots
+        os.replace(tmp_path, path)
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    with open(_current_path(root) + '.tmp', 'w') as f:
+        f.write(version)
+    os.replace(_current_path(root) + '.tmp', _current_path(root))
+
+    _prune(root, SNAPSHOT_CONFIG['keep'])
+
+    build_time = time.time() - start_time
+    print(f"[SNAPSHOT] Version {version} built in {build_time:.2f} seconds: "
+          f"{manifest['n_ratings']} ratings, {manifest['n_order_lines']} order lines, "
+          f"{manifest['n_items']} items.")
+    return version
+
+def _prune(root, keep):
+    """Delete all but the latest keep snapshot versions"""
+    versions = sorted(d for d in os.listdir(root)
+                      if os.path.isdir(os.path.join(root, d)) and not d.endswith('.tmp'))
+    for version in versions[:-keep]:
+        shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+
+def _read_manifest(version=None, root=None):
+    """Version and manifest of a snapshot (the current one by default), or (None, None)"""
+    root = root or SNAPSHOT_CONFIG['root']
+    if version is None:
+        if not os.path.exists(_current_path(root)):
+            return None, None
+        with open(_current_path(root)) as f:
+            version = f.read().strip()
+
+    with open(os.path.join(root, version, 'manifest.json')) as f:
+        return version, json.load(f)
+
+def load_snapshot(version=None, root=None):
+    """Load a snapshot (the current one by default) with its arrays memory-mapped.
+
+    Returns None if no snapshot has been built yet.
+    """
+    root = root or SNAPSHOT_CONFIG['root']
+    version, manifest = _read_manifest(version, root)
+    if manifest is None:
+        return None
+
+    path = os.path.join(root, version)
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in ARRAYS}
+    return Snapshot(version, path, _decode_watermark(manifest['watermark']),
+                    set(manifest.get('boundary_orders', [])), manifest['n_orders'], **arrays)
+
+def snapshot_info(version=None, root=None):
+    """Version, age and data horizon of a snapshot (the current one by default), or None"""
+    version, manifest = _read_manifest(version, root)
+    if manifest is None:
+        return None
+
+    created_at = datetime.fromisoformat(manifest['created_at'])
+    return {
+        'version': version,
+        'created_at': manifest['created_at'],
+        'age_s': round((datetime.now() - created_at).total_seconds(), 1),
+        'watermark': manifest['watermark']['value'],
+        'n_ratings': manifest['n_ratings'],
+        'n_order_lines': manifest['n_order_lines']
+    }
+
+if __name__ == '__main__':
+    build_snapshot()